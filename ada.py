@@ -6,338 +6,2035 @@ Command line RPN calculator that performs a variety of common functions.
 
 """
 
+# (phase, time) marks for --startup-profile; time is built into the interpreter, so the first mark comes before any real import, and the imports below are measured
+import time
+startup_marks = [('start', time.perf_counter())]
+
+import heapq
 import json
 import math
 import operator
-import random
-import statistics
-import textwrap
-from inspect import getmembers, isfunction
+import os
+import re
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, deque
 from string import ascii_letters, ascii_lowercase, ascii_uppercase, digits
-from sys import modules
+from sys import argv, byteorder, modules, stdin
+from time import perf_counter
+
+# statistics, random, textwrap, and inspect are imported by the few functions that use them, so that starting the calculator doesn't wait for them
+
+startup_marks.append(('imports', perf_counter()))
+
+# STACK ====================
+
+# True while compact mode is on: new stacks keep their values in an array of doubles
+compact_mode = False
+
+
+class Stack:
+    """
+    The calculator's stack. Index 0 is always x:, index 1 is y:, and so on, just as it was when the stack was a plain [list] -- but the values are stored with x: at the END of an internal list so that pushing and popping x: never has to shift the rest of the stack. push() and pop() cost the same whether the stack holds 4 values or a million imported ones.
+
+    Only numbers go on the stack: push() and storing in a register turn anything else (a complex result, for example) into nan, in its own register, so that no operand moves. Drawing the stack never has to check it.
+
+    A compact stack (see compact()) keeps its values in an array('d') instead of a list: 8 bytes per value instead of about 32. It stays compact only while every value is a float; the first value that isn't (a whole number from factorial, or a series in vector mode) turns it back into a list.
+
+    A stack loaded from a snapshot (see from_buffer()) is compact too, but reads its values straight from the memory-mapped file until it first changes; only then are they copied into an array('d').
+
+    checkpoint() starts an undo log: every change after it is recorded, so that rollback() can undo them all (Ctrl-C) and commit() can forget them. The log costs a little per change, never a copy of the stack.
+
+    exact is True once an int (an exact integer from a base conversion, see push_integer()) has been put on the stack. Until then, math_op1() and math_op2() skip the checks that only an int result needs.
+    """
+
+    __slots__ = ('_items', '_stats', '_zeros', '_undo', 'exact')
+
+    def __init__(self, values=(), compact=None):
+        # values are given in stack order: x: first, the deepest element last
+        if compact is None:
+            compact = compact_mode
+        if compact and type(values) is not array:
+            values = list(values)
+            compact = all(type(value) is float for value in values)
+        self._items = array('d', values) if compact else list(values)
+        self._items.reverse()
+        self.exact = not compact and int in map(type, self._items)
+        # RunningStats, built the first time summary() is called, and (while there is one) the length of the run of zeros at the bottom of the stack
+        self._stats = None
+        self._zeros = 0
+        # the undo log (see checkpoint()), or None
+        self._undo = None
+
+    @classmethod
+    def from_array(cls, values):
+        """
+        A compact stack that takes over <values>, an array('d') in stack order, instead of copying it, so that a large import is never in memory twice.
+        """
+        stack = cls(compact=False)
+        values.reverse()
+        stack._items = values
+        return stack
+
+    @classmethod
+    def from_buffer(cls, values):
+        """
+        A compact stack that reads its values from <values>, a memoryview of doubles (or an array('d')) with the deepest element first, without copying them.
+        """
+        stack = cls(compact=False)
+        stack._items = values
+        return stack
+
+    @property
+    def compact(self):
+        return type(self._items) is not list
+
+    def doubles(self):
+        """
+        The values as doubles, deepest element first, in an object that supports the buffer protocol: the array('d') or memoryview of a compact stack itself, or else a new array('d'). Raises TypeError if the stack holds a series.
+        """
+        return self._items if self.compact else array('d', self._items)
+
+    def push(self, value):
+        """
+        Put value in x:, moving everything else up one register. A value that is not a number (e.g., a complex result) goes in as nan, so that the registers above it stay where they are.
+        """
+        if type(value) is not float:
+            if not is_number(value):
+                value = math.nan
+            else:
+                self._loosen()
+                if type(value) is int:
+                    self.exact = True
+        try:
+            self._items.append(value)
+        except AttributeError:
+            # a loaded stack is read-only until it first changes
+            self._own()
+            self._items.append(value)
+        if self._undo is not None:
+            self._undo.append(len(self._items) - 1)
+        if self._stats is not None:
+            self._track(len(self._items) - 1, None, value)
+
+    def pop(self):
+        """
+        Remove x: and return it; everything else drops down one register.
+        """
+        try:
+            value = self._items.pop()
+        except AttributeError:
+            self._own()
+            value = self._items.pop()
+        if self._undo is not None:
+            self._undo.append((len(self._items) + 1, value))
+        if self._stats is not None:
+            self._track(len(self._items), value, None)
+        return value
+
+    def pad(self, depth=4):
+        """
+        Make sure the stack holds at least <depth> elements by adding zeros at the bottom.
+        """
+        missing = depth - len(self._items)
+        if missing > 0:
+            self._own()
+            if self._undo is not None:
+                self._undo.append(('pad', missing))
+            zeros = [0.0] * missing
+            self._items[0:0] = array('d', zeros) if self.compact else zeros
+            if self._stats is not None:
+                # the new zeros join the run at the bottom, which summary() leaves out
+                size = len(self._items)
+                left_out = self._left_out(self._zeros, size - missing) + missing
+                self._zeros += missing
+                self._count_zeros(left_out - self._left_out(self._zeros, size))
+
+    def copy(self):
+        stack = Stack(compact=False)
+        stack._items = self._items[:]
+        stack.exact = self.exact
+        return stack
+
+    def checkpoint(self):
+        """
+        Start recording changes, so that rollback() can undo them.
+        """
+        self._undo = []
+
+    def commit(self):
+        """
+        Keep the changes made since checkpoint(), and stop recording.
+        """
+        self._undo = None
+
+    def rollback(self):
+        """
+        Undo every change made since checkpoint(), newest first, and stop recording.
+        """
+        undo, self._undo = self._undo, None
+        for change in reversed(undo or ()):
+            if type(change) is int:
+                # a push: the stack was this long before it
+                del self._items[change:]
+            elif type(change[0]) is int:
+                # a pop: the stack's length and x: before it
+                del self._items[change[0] - 1:]
+                self._items.append(change[1])
+            elif change[0] == 'set':
+                self._items[change[1]] = change[2]
+            elif change[0] == 'pad':
+                del self._items[:change[1]]
+            else:
+                # the values were moved to another kind of storage; the old one was not changed after that
+                self._items = change[1]
+        # the running figures no longer match; they are rebuilt when next needed
+        self._stats = None
+
+    def summary(self):
+        """
+        Summary statistics for the stack, ignoring the run of zeros at the bottom of the stack (but never x:). Same results as summarize(), but after the first call the figures are kept up to date as values are pushed and popped, and so is the length of the run of zeros, so later calls depend on neither the size of the stack nor the number of zeros.
+        """
+        if self.compact:
+            # running figures would take several times the memory of the values themselves
+            return summarize_array(self._items)
+
+        size = len(self._items)
+        if self._stats is None:
+            if not all(is_real(value) for value in self._items):
+                return summarize(list(self))
+            self._zeros = 0
+            while self._zeros < size and self._items[self._zeros] == 0:
+                self._zeros += 1
+            self._stats = RunningStats(self._items[self._left_out(self._zeros, size):])
+
+        return self._stats.summary(self._items, self._left_out(self._zeros, size))
+
+    @staticmethod
+    def _left_out(zeros, size):
+        # how many values at the bottom summary() leaves out: the run of zeros, but never x:
+        return min(zeros, size - 1) if size else 0
+
+    def _count_zeros(self, change):
+        # <change> more zeros from the bottom of the stack are counted in RunningStats (fewer, if negative)
+        for i in range(change):
+            self._stats.add(0.0)
+        for i in range(-change):
+            self._stats.remove(0.0)
+
+    def _track(self, ndx, old, new):
+        """
+        Keep RunningStats and the run of zeros at the bottom up to date after the value at <ndx> (of the internal list, 0 for the deepest element) changed from old to new. old is None for a push, and new is None for a pop. Gives up on the running figures for anything that is not a real number.
+        """
+        if new is not None and not is_real(new):
+            self._stats = None
+            return
+        items = self._items
+        size = len(items)
+        before = self._left_out(self._zeros, size + (new is None) - (old is None))
+
+        if old is not None and ndx >= before:
+            self._stats.remove(old)
+
+        # the run of zeros ends below the first value that is not zero
+        zeros = self._zeros
+        if new is None:
+            zeros = min(zeros, size)
+        elif new != 0:
+            zeros = min(zeros, ndx)
+        elif ndx == zeros:
+            zeros += 1
+            while zeros < size and items[zeros] == 0:
+                zeros += 1
+        self._zeros = zeros
+        after = self._left_out(zeros, size)
+
+        # the zeros that move into (or out of) the values counted, other than at ndx itself
+        if after < before:
+            self._count_zeros(before - after - (after <= ndx < before))
+        else:
+            self._count_zeros(before - after + (before <= ndx < after))
+
+        if new is not None and ndx >= after:
+            self._stats.add(new)
+
+    def _loosen(self):
+        # a value that isn't a float can't go in an array('d'); keep the values in a list from now on
+        if self.compact:
+            if self._undo is not None:
+                self._undo.append(('items', self._items))
+            self._items = self._items.tolist()
+
+    def _own(self):
+        # copy the values of a loaded stack out of the file, so that they can change
+        if type(self._items) is memoryview:
+            if self._undo is not None:
+                self._undo.append(('items', self._items))
+            items = array('d')
+            items.frombytes(self._items.cast('B'))
+            self._items = items
+
+    def _index(self, ndx):
+        size = len(self._items)
+        if ndx < 0:
+            ndx += size
+        if not 0 <= ndx < size:
+            raise IndexError('stack index out of range')
+        return size - 1 - ndx
+
+    def __getitem__(self, ndx):
+        if ndx == 0:
+            # x:, by far the most read; an empty stack raises IndexError, as below
+            return self._items[-1]
+        if isinstance(ndx, slice):
+            return [self[i] for i in range(*ndx.indices(len(self._items)))]
+        return self._items[self._index(ndx)]
+
+    def __setitem__(self, ndx, value):
+        ndx = self._index(ndx)
+        if type(self._items) is memoryview:
+            self._own()
+        if type(value) is not float:
+            if not is_number(value):
+                # as in push()
+                value = math.nan
+            else:
+                self._loosen()
+                if type(value) is int:
+                    self.exact = True
+        if self._undo is not None:
+            self._undo.append(('set', ndx, self._items[ndx]))
+        old, self._items[ndx] = self._items[ndx], value
+        if self._stats is not None:
+            self._track(ndx, old, value)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        # x: first, just like the old [list]
+        return reversed(self._items)
+
+    def __reversed__(self):
+        # deepest element first
+        return iter(self._items)
+
+    def __repr__(self):
+        return 'Stack(' + repr(list(self)) + ')'
+
+    # register accessors
+    x = property(lambda self: self[0], lambda self, v: self.__setitem__(0, v))
+    y = property(lambda self: self[1], lambda self, v: self.__setitem__(1, v))
+    z = property(lambda self: self[2], lambda self, v: self.__setitem__(2, v))
+    t = property(lambda self: self[3], lambda self, v: self.__setitem__(3, v))
+
+
+def is_number(value):
+    """
+    True for anything that can go on the stack as it is: a real number that is not nan, or (in vector mode) a series. Stack stores anything else as nan.
+    """
+    if isinstance(value, (int, float)):
+        return value == value
+    return is_vector(value)
+
+
+def is_real(value):
+    """
+    True for an int or float that is not nan.
+    """
+    return type(value) in (float, int) and value == value
+
+
+class RunningStats:
+    """
+    Count, sum, mean, variance, minimum, maximum, and median of a changing collection of numbers, each updated as numbers are added and removed instead of being recomputed from scratch.
+
+    -- mean and variance: Welford's method (run backwards for removals); recomputed from scratch once there have been more removals than there are values, or once the variance is too small next to the size of the updates that produced it to be trusted
+    -- median: two heaps, the lower half (as negatives) and the upper half, with removals deleted lazily when they reach the top of a heap
+    -- minimum and maximum: kept for the non-zero values, plus a count of zeros; recomputed only when the current minimum or maximum is removed
+    """
+
+    __slots__ = ('count', 'total', 'mean', 'm2', 'scale', 'removals', 'zeros', 'minimum', 'maximum',
+                 'stale', 'lower', 'upper', 'lower_size', 'upper_size', 'removed')
+
+    def __init__(self, values=()):
+        values = sorted(values)
+        self.count = len(values)
+        self._refresh(values)
+
+        nonzero = [v for v in values if v != 0]
+        self.zeros = self.count - len(nonzero)
+        self.minimum = nonzero[0] if nonzero else None
+        self.maximum = nonzero[-1] if nonzero else None
+        self.stale = False
+
+        # a sorted list is already a heap
+        half = (self.count + 1) // 2
+        self.lower = [-v for v in reversed(values[:half])]
+        self.upper = values[half:]
+        self.lower_size, self.upper_size = half, self.count - half
+        self.removed = {}
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        change = delta * (value - self.mean)
+        self.m2 += change
+        self.scale += change
+
+        if value == 0:
+            self.zeros += 1
+        elif not self.stale:
+            if self.minimum is None or value < self.minimum:
+                self.minimum = value
+            if self.maximum is None or value > self.maximum:
+                self.maximum = value
+
+        if not self.lower or value <= -self.lower[0]:
+            heapq.heappush(self.lower, -value)
+            self.lower_size += 1
+        else:
+            heapq.heappush(self.upper, value)
+            self.upper_size += 1
+        self._balance()
+
+    def remove(self, value):
+        self.count -= 1
+        self.removals += 1
+        self.total -= value
+        if self.count:
+            mean = self.mean
+            self.mean = (mean * (self.count + 1) - value) / self.count
+            change = (value - mean) * (value - self.mean)
+            self.m2 = max(0.0, self.m2 - change)
+            self.scale += change
+        else:
+            self.mean, self.m2 = 0.0, 0.0
+
+        if value == 0:
+            self.zeros -= 1
+        elif value == self.minimum or value == self.maximum:
+            self.stale = True
+
+        self.removed[value] = self.removed.get(value, 0) + 1
+        if value <= -self.lower[0]:
+            self.lower_size -= 1
+            if value == -self.lower[0]:
+                self._prune(self.lower, -1)
+        else:
+            self.upper_size -= 1
+            if value == self.upper[0]:
+                self._prune(self.upper, 1)
+        self._balance()
+
+    def median(self):
+        if self.lower_size > self.upper_size:
+            return -self.lower[0]
+        return (-self.lower[0] + self.upper[0]) / 2
+
+    def summary(self, values, start=0):
+        """
+        Return (count, mean, median, st. dev., minimum, maximum, sum). St. dev. is None if there are fewer than two values. values[start:] are the numbers being summarized (values[:start] may only be zeros); they are only read if a figure has to be recomputed.
+        """
+        if self.removals > self.count:
+            self._refresh(values[start:])
+
+        if self.stale:
+            nonzero = [v for v in values if v != 0]
+            self.minimum = min(nonzero) if nonzero else None
+            self.maximum = max(nonzero) if nonzero else None
+            self.stale = False
+
+        # rounding errors grow with the updates; if they could matter, recompute
+        if self.m2 < self.scale * 1e-8:
+            self._refresh(values[start:])
+
+        sd = math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else None
+        extremes = [v for v in (self.minimum, self.maximum) if v is not None]
+        if self.zeros:
+            extremes.append(0)
+        return (self.count, self.total / self.count, self.median(), sd,
+                min(extremes), max(extremes), self.total)
+
+    def _refresh(self, values):
+        self.total = math.fsum(values)
+        self.mean = self.total / self.count if self.count else 0.0
+        self.m2 = math.fsum((v - self.mean) ** 2 for v in values)
+        self.scale = self.m2
+        self.removals = 0
+
+    def _balance(self):
+        if self.lower_size > self.upper_size + 1:
+            heapq.heappush(self.upper, -heapq.heappop(self.lower))
+            self.lower_size -= 1
+            self.upper_size += 1
+            self._prune(self.lower, -1)
+        elif self.lower_size < self.upper_size:
+            heapq.heappush(self.lower, -heapq.heappop(self.upper))
+            self.lower_size += 1
+            self.upper_size -= 1
+            self._prune(self.upper, 1)
+
+    def _prune(self, heap, sign):
+        # drop removed values that have reached the top of the heap
+        while heap and self.removed.get(sign * heap[0]):
+            value = sign * heapq.heappop(heap)
+            self.removed[value] -= 1
+            if not self.removed[value]:
+                del self.removed[value]
+
+
+# MAIN CALCULATOR FUNCTION ====================
+
+def RPN(stack, user_dict, lastx_list, mem, settings, tape):
+    """
+    Main function that gets user's input and does initial processing. This means that some inputs can be handled easily, but most will require further processing by process_item() which will return a [list] of individual items that the user entered.
+
+    The loop itself is repl(). The first prompt is drawn here, before asyncio is imported: importing it takes longer than everything else ada does to start.
+    """
+    stack = print_prompt(stack, settings, tape)
+
+    import asyncio
+    return asyncio.run(repl(stack, user_dict, lastx_list, mem, settings, tape))
+
+
+# names that ask the user questions; lines that use them are evaluated in the main thread, where the keyboard is
+asks_questions = {'import', 'MD', 'set', 'user'}
+
+
+async def repl(stack, user_dict, lastx_list, mem, settings, tape):
+    """
+    Read a line, evaluate it, draw the prompt; repeat until the user quits.
+
+    Lines are evaluated in one worker thread, kept for the whole session, while this loop waits, so a long command (importing a big file, stats or map on millions of values) never leaves the user without a way out: after a second, the loop reports how long the command has been running, and Ctrl-C cancels it. The command stops at its next check_cancel() -- between steps, never halfway through changing the stack -- and once it has stopped, the stack, the memory registers, and lastx are put back as they were before the line, and the line is taken off the tape. Lines that ask questions (see {asks_questions}) are evaluated in the main thread instead, where the keyboard is; Ctrl-C while one waits for an answer interrupts it at once. At the prompt, Ctrl-C ends the program, as q does.
+    """
+    import asyncio
+    import builtins
+    import concurrent.futures
+    import signal
+    import sys
+
+    global cancel_requested, compact_mode, vector_mode
+    loop = asyncio.get_running_loop()
+    evaluator = concurrent.futures.ThreadPoolExecutor(1)
+    output = ThreadOutput(sys.stdout)
+    # True while the main thread is waiting for the keyboard, where Ctrl-C can interrupt it at once
+    reading = {'keyboard': False}
+
+    def keyboard(prompt=''):
+        reading['keyboard'] = True
+        try:
+            return builtins.input(prompt)
+        finally:
+            reading['keyboard'] = False
+
+    def interrupt(signum, frame):
+        global cancel_requested
+        if reading['keyboard']:
+            raise KeyboardInterrupt
+        # anywhere else, the line stops at its next check_cancel(), and its output is dropped until then
+        cancel_requested = True
+        output.muted = True
+
+    previous_handler = signal.signal(signal.SIGINT, interrupt)
+    globals()['input'] = keyboard
+    sys.stdout = output
+    try:
+        while True:
+            # get the command line entry from the user
+            try:
+                entered_value = keyboard('').strip()
+            except (KeyboardInterrupt, EOFError):
+                entered_value = 'q'
+
+            # make sure parentheses are balanced before proceeding
+            if entered_value.count('(') != entered_value.count(')'):
+                print('Unbalanced parentheses.')
+                stack = print_prompt(stack, settings, tape)
+                continue
+
+            # add the current expression to the tape
+            tape.append(entered_value)
+
+            # if <ENTER> alone was pressed, duplicate the x: value on the stack
+            if len(entered_value) == 0:
+                stack.push(stack[0])
+                stack = print_prompt(stack, settings, tape)
+                continue
+
+            # pick up edits made to config.json or constants.json outside this session
+            settings, user_dict = settings_file.load(), constants_file.load()
+
+            # what Ctrl-C goes back to: the stack and the memory registers log their changes instead of being copied, and the tape loses this line
+            before = stack, len(tape) - 1, list(lastx_list), vector_mode, compact_mode
+            stack.checkpoint()
+            mem.checkpoint()
+            cancel_requested = False
+
+            try:
+                if asks_questions.intersection(split_entry(str(user_dict.get(entered_value, [entered_value])[0]))):
+                    result = evaluate(stack, user_dict, lastx_list, mem, settings, tape, entered_value)
+                else:
+                    work = loop.run_in_executor(
+                        evaluator, evaluate, stack, user_dict, lastx_list, mem, settings, tape, entered_value)
+                    progress = loop.create_task(report_progress(output, work))
+                    try:
+                        result = await work
+                    finally:
+                        progress.cancel()
+                        output.clear_progress()
+                        output.muted = False
+            except KeyboardInterrupt:
+                # Cancelled, or Ctrl-C while a question waited for an answer; either way, nothing is still running
+                stack, tape_count, lastx_list, vector_mode, compact_mode = before
+                stack.rollback()
+                mem.rollback()
+                tape.truncate(tape_count)
+                print('\n' + '='*45)
+                print('Cancelled. The stack is as it was.')
+                print('='*45)
+                stack = print_prompt(stack, settings, tape)
+                continue
+
+            before[0].commit()
+            mem.commit()
+            stack, lastx_list, tape, user_dict, settings, quit = result
+
+            if quit:
+                # save any changes to disk before quitting
+                save_files(force=True)
+                print('\nEnd program.\n')
+                return None
+
+            save_files()
+            stack = print_prompt(stack, settings, tape)
+    finally:
+        sys.stdout = output.stream
+        del globals()['input']
+        signal.signal(signal.SIGINT, previous_handler)
+        evaluator.shutdown(wait=False)
+
+
+async def report_progress(output, future):
+    """
+    While future is pending, show how long it has been running, once a second, whenever the command has printed nothing for a second.
+    """
+    import asyncio
+
+    start = perf_counter()
+    while not future.done():
+        await asyncio.sleep(1)
+        if cancel_requested:
+            # a step that runs in C (e.g., sorting) finishes before the command can stop
+            output.show_progress('stopping... {:.0f} s'.format(perf_counter() - start))
+        elif perf_counter() - output.last_write >= 1:
+            output.show_progress('working... {:.0f} s (Ctrl-C to cancel)'.format(perf_counter() - start))
+
+
+class ThreadOutput:
+    """
+    Stands in for sys.stdout while repl() runs. While muted (a command has been cancelled but hasn't stopped yet), output from threads other than the main one is dropped. The progress report is cleared before anything else is written.
+    """
+
+    def __init__(self, stream):
+        import threading
+
+        self.stream, self.get_ident = stream, threading.get_ident
+        self.main = self.get_ident()
+        self.muted, self.progress, self.last_write = False, '', perf_counter()
+
+    def write(self, text):
+        if self.muted and self.get_ident() != self.main:
+            return len(text)
+        self.clear_progress()
+        self.last_write = perf_counter()
+        return self.stream.write(text)
+
+    def show_progress(self, text):
+        self.stream.write('\r' + text)
+        self.stream.flush()
+        self.progress = text
+
+    def clear_progress(self):
+        if self.progress:
+            self.stream.write('\r' + ' ' * len(self.progress) + '\r')
+            self.progress = ''
+
+    def __getattr__(self, name):
+        # flush(), fileno(), encoding, ...
+        return getattr(self.stream, name)
+
+
+def print_prompt(stack, settings, tape):
+    """
+    Draw everything the user sees before typing: the tape (if requested in {settings}), the register, the menu, and the first-time tip.
+    """
+    # print the tape if requested in {settings}
+    if settings['show_tape'] == 'Y':
+        print_tape(stack, tape)
+
+    # print the register
+    stack = print_register(stack, settings)
+
+    # generate the menu
+    if settings['show_menu'] == 'Y':
+        print()
+        for i in range(0, len(menu), 4):
+            m = ''.join(menu[i:i+4])
+            print(m)
+
+    # print user tip, optionally
+    if settings['show_tips'] == 'Y':
+        print('\nType:\n     basics\nto get started with RPN.')
+        # only show tip once
+        settings['show_tips'] = 'N'
+        settings_file.changed()
+
+    return stack
+
+
+def print_startup_profile(target=None):
+    """
+    Print the time spent in each phase of starting ada, from {startup_marks}, and compare the total with target (milliseconds), if given. Interpreter start-up and compiling ada.py happen before the first mark, so they are not included (the imports at the top of ada.py are); running "python -m ada" instead of "python ada.py" lets Python reuse the compiled file.
+    """
+    print('='*45)
+    print('startup profile (ms)')
+    for (_, before), (phase, after) in zip(startup_marks, startup_marks[1:]):
+        print('{:>20} {:>10.2f}'.format(phase, (after - before) * 1e3))
+    total = (startup_marks[-1][1] - startup_marks[0][1]) * 1e3
+    print('{:>20} {:>10.2f}'.format('total', total))
+    if target is not None:
+        print('{:>20} {:>10.2f} ({})'.format('target', target, 'met' if total <= target else 'NOT met'))
+    print('='*45)
+
+
+def batch(stack, user_dict, lastx_list, mem, settings, tape, lines):
+    """
+    Evaluate lines of input one after another, with the same results as typing them into the calculator, but without drawing the register, the menu, or the tape after each line. Used for:
+
+    ada.py -e "4 16 s 2 ^ 4 / /"
+    ada.py expressions.txt
+    ada.py - < expressions.txt
+    """
+    # print_register() keeps four registers on the stack in the calculator; do the same here
+    stack.pad(4)
+    for entered_value in lines:
+        entered_value = entered_value.strip()
+
+        if entered_value.count('(') != entered_value.count(')'):
+            print('Unbalanced parentheses:', entered_value)
+            continue
+
+        tape.append(entered_value)
+
+        # an empty line duplicates x:, just like <ENTER>
+        if not entered_value:
+            stack.push(stack[0])
+            continue
+
+        stack, lastx_list, tape, user_dict, settings, quit = evaluate(
+            stack, user_dict, lastx_list, mem, settings, tape, entered_value)
+
+        # print_register() keeps four registers on the stack in the calculator; do the same here
+        stack.pad(4)
+
+        if quit:
+            break
+
+    return stack
+
+def parallel_batch(lines, jobs, settings, user_dict, base=None):
+    """
+    Evaluate lines that don't depend on each other, sharing them among <jobs> worker processes, and print x: for each line, in the order of the lines. Used for:
+
+    ada.py --jobs 4 expressions.txt
+
+    Every line starts from an empty stack, empty memory registers, and an empty tape, so its result is the same whichever worker evaluates it and whatever came before it. Anything a line prints (an error message, for example) comes out just before its result. With one job, the lines are evaluated in this process; otherwise each worker sends back the metrics of every line with its result, and they are added to {metrics} here.
+
+    There is no keyboard to answer a command that asks a question (e.g., set, import, user); a line that uses one is skipped with a message, and its result is nan.
+    """
+    globals()['input'] = no_input
+    if jobs == 1:
+        results = map(batch_line, lines)
+        for output, value in results:
+            print_result(output, value, base)
+        return
+
+    import multiprocessing
+
+    # lines go to the workers in chunks, so that passing them between processes costs little per line
+    with multiprocessing.Pool(jobs, batch_worker, (settings, user_dict)) as pool:
+        for output, value, taken in pool.imap(worker_line, lines, chunksize=256):
+            metrics.merge(taken)
+            print_result(output, value, base)
+
+
+def batch_worker(settings, user_dict):
+    # runs once in each worker process of parallel_batch(); a forked worker starts with a copy of this process's metrics, so it starts again from zero
+    global worker_settings, worker_user_dict, metrics, input
+    worker_settings, worker_user_dict = settings, user_dict
+    metrics = Metrics()
+    input = no_input
+    # stats and list_stack read the global {settings}, which a spawned worker (the default on macOS and Windows) never gets from main
+    globals()['settings'] = settings
+
+
+def worker_line(entered_value):
+    # batch_line() in a worker process, with the metrics of the line: (output, x:, Metrics.take())
+    output, value = batch_line(entered_value)
+    return output, value, metrics.take()
+
+
+def batch_line(entered_value):
+    """
+    Evaluate one line of parallel_batch() on a fresh stack. Returns (output, x:), where output is whatever the line printed.
+    """
+    import contextlib
+    import io
+
+    stack, mem, lastx_list, tape = Stack([0.0]), Memory(), [0.0], Tape()
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            stack = batch(stack, worker_user_dict, lastx_list, mem, worker_settings, tape, [entered_value])
+        except EOFError:
+            # a command asked a question (see no_input())
+            print('='*45)
+            print('Skipped "' + entered_value.strip() + '": it asks a question, and --jobs has no keyboard to answer it.')
+            print('='*45)
+            return output.getvalue(), math.nan
+    return output.getvalue(), stack[0]
+
+
+def print_result(output, value, base=None):
+    # one line of batch mode's results: x:, in base <base> if it's an integer
+    if output:
+        print(output, end='')
+    if base and stack_integer(value) is not None:
+        value = show_base(stack_integer(value), base)
+    print(value)
+
+
+# settings and constants for batch_line(); parallel_batch() sets them in each worker process, and main for one job
+worker_settings, worker_user_dict = {}, {}
+
+
+# SERVER ====================
+
+# names a server session refuses: vector mode and compact mode are shared by every session in the process, and save and load would give clients the server's files
+server_refuses = {'compact', 'load', 'save', 'vector'}
+
+# seconds an expression may run in a server before it is stopped and its changes are undone
+server_time_limit = 10
+
+
+class Session:
+    """
+    One client of the server: its own stack, memory registers, lastx, and tape. Settings and user-defined constants are shared, as they are by everything run in one directory.
+    """
+
+    def __init__(self, settings, user_dict):
+        self.stack, self.mem, self.lastx_list, self.tape = Stack([0.0]), Memory(), [0.0], Tape()
+        self.stack.pad(4)
+        self.settings, self.user_dict = settings, user_dict
+        self.before = None
+
+    def evaluate(self, entered_value):
+        """
+        Evaluate one line, as batch() does. Returns (quit, output), where output is whatever the line printed (e.g., an error message). Until the line is done, rollback() can undo it.
+        """
+        import contextlib
+        import io
+
+        entered_value = entered_value.strip()
+        self.before = self.stack, len(self.tape), list(self.lastx_list)
+        self.stack.checkpoint()
+        self.mem.checkpoint()
+
+        quit, output = False, io.StringIO()
+        with contextlib.redirect_stdout(output):
+            if entered_value.count('(') != entered_value.count(')'):
+                print('Unbalanced parentheses:', entered_value)
+            elif not entered_value:
+                self.tape.append(entered_value)
+                self.stack.push(self.stack[0])
+            else:
+                self.tape.append(entered_value)
+                self.stack, self.lastx_list, self.tape, self.user_dict, self.settings, quit = evaluate(
+                    self.stack, self.user_dict, self.lastx_list, self.mem, self.settings, self.tape, entered_value)
+                self.stack.pad(4)
+        self.commit()
+        return quit, output.getvalue().strip()
+
+    def commit(self):
+        self.before[0].commit()
+        self.mem.commit()
+
+    def rollback(self):
+        """
+        Undo the line that was being evaluated (one that took too long): the stack, memory registers, lastx, and tape go back to what they were before it.
+        """
+        self.stack, tape_count, self.lastx_list = self.before
+        self.stack.rollback()
+        self.mem.rollback()
+        self.tape.truncate(tape_count)
+
+    def respond(self, line):
+        """
+        Answer one request line. Returns (response, quit).
+
+        Request:  {"expression": "2 3 +", "id": 1, "stack": true}
+        Response: {"id": 1, "x": 5.0, "stack": [0.0, 0.0, 0.0, 5.0], "output": ""}
+
+        "id" is optional and is returned as it was sent. "stack" (default false) asks for the whole stack, deepest element first. "output" is anything the expression printed. A request that can't be evaluated gets {"id": ..., "error": "..."} instead.
+        """
+        request = self.parse(line)
+        if 'error' in request:
+            return request, False
+        return self.answer(request)
+
+    @staticmethod
+    def parse(line):
+        # a request, or an error response for a line that isn't one
+        try:
+            request = json.loads(line, parse_constant=not_json)
+            if type(request['expression']) != str:
+                raise TypeError
+        except (ValueError, TypeError, KeyError):
+            return {'error': 'expected {"expression": "..."}'}
+        request.pop('error', None)
+        return request
+
+    def answer(self, request):
+        # evaluate a request from parse(); returns (response, quit)
+        response = {'id': request.get('id')}
+        try:
+            quit, output = self.evaluate(request['expression'])
+        except Cancelled:
+            # the time limit (see serve_client()); the line has stopped, so its changes can be undone
+            self.rollback()
+            response['error'] = 'stopped after {} seconds; the stack is as it was'.format(server_time_limit)
+            return response, False
+        except Exception as e:
+            # e.g., a command that asks a question; there is no keyboard to answer it
+            self.commit()
+            response['error'] = '{}: {}'.format(type(e).__name__, e)
+            return response, False
+
+        response['x'] = to_json(self.stack[0])
+        if request.get('stack'):
+            response['stack'] = [to_json(value) for value in reversed(self.stack)]
+        response['output'] = output
+        return response, quit
+
+
+def refuse_in_server():
+    """
+    Replace the handler of every name in {server_refuses} in {dispatch} with one that does nothing but say so. Every way of reaching a name -- typed, in a user-defined expression, compiled, or rerun from the tape -- goes through {dispatch}, so none of them gets past the refusal.
+    """
+    refused = {dispatch[name].function for name in server_refuses}
+    for name, handler in list(dispatch.items()):
+        if handler.function in refused:
+            dispatch[name] = Handler(name, server_refusal(name, handler.convention), handler.convention, handler.arity)
+    compiled_expressions.clear()
+
+
+def server_refusal(name, convention):
+    # a function with the calling convention of the one it replaces (see Handler) that only prints a message
+    def refused(stack, *args):
+        print('"' + name + '" is not available in a server session.')
+        if convention == 'word':
+            word, user_dict, lastx_list, mem, settings, tape = args
+            return stack, lastx_list, tape, user_dict
+        return stack
+    return refused
+
+
+def to_json(value):
+    """
+    A stack value as JSON can hold it. A series (vector mode) becomes a list. JSON has no numbers for nan, inf, and -inf, so they become the strings "nan", "inf", and "-inf".
+    """
+    if hasattr(value, 'tolist'):
+        if numpy.isfinite(value).all():
+            return value.tolist()
+        return [to_json(v) for v in value.tolist()]
+    if type(value) is float and not math.isfinite(value):
+        return repr(value)
+    return value
+
+
+def not_json(name):
+    # json.loads() accepts NaN, Infinity, and -Infinity; a request with one is refused, so that no response echoes it
+    raise ValueError(name + ' is not JSON')
+
+
+def no_input(prompt=''):
+    # replaces input() in a server: commands that ask a question fail instead of waiting for a keyboard
+    raise EOFError('"' + prompt.strip() + '" needs an answer from the keyboard')
+
+
+class Evaluator:
+    """
+    Evaluates the requests of every session of a server, one at a time, in one worker thread (an executor with one thread), so the event loop goes on reading and writing for every other client while an expression runs.
+
+    Each trip to the worker takes every request that is waiting, not just one, so with many clients, handing work between the threads costs little per request; each result goes back as soon as it is ready. watch() cancels an expression that has run for longer than {server_time_limit} seconds: it stops at its next check_cancel(), and its changes are undone (see Session.answer()). Time spent waiting behind other requests doesn't count.
+    """
+
+    def __init__(self, loop):
+        import collections
+        import concurrent.futures
+        import threading
+
+        self.loop = loop
+        self.executor = concurrent.futures.ThreadPoolExecutor(1)
+        # (session, request, future) for each request not yet started, and whether the worker is taking them
+        self.waiting, self.draining = collections.deque(), False
+        # when the request being evaluated started, or None; shared with watch() under the lock
+        self.started, self.lock = None, threading.Lock()
+
+    def answer(self, session, request):
+        # a future for session.answer(request)
+        future = self.loop.create_future()
+        with self.lock:
+            self.waiting.append((session, request, future))
+            if self.draining:
+                return future
+            self.draining = True
+        self.loop.run_in_executor(self.executor, self.drain)
+        return future
+
+    def drain(self):
+        # in the worker thread: evaluate requests until none are waiting
+        global cancel_requested
+        while True:
+            with self.lock:
+                if not self.waiting:
+                    self.draining = False
+                    return
+                session, request, future = self.waiting.popleft()
+                self.started, cancel_requested = perf_counter(), False
+
+            # pick up edits made to config.json or constants.json, as RPN() does
+            settings_file.load()
+            constants_file.load()
+            try:
+                result = session.answer(request)
+                save_files()
+            except BaseException as error:
+                self.loop.call_soon_threadsafe(settle, future, None, error)
+            else:
+                self.loop.call_soon_threadsafe(settle, future, result, None)
+            finally:
+                with self.lock:
+                    self.started = None
+
+    async def watch(self):
+        # cancel an expression that runs too long; checked ten times per time limit
+        import asyncio
+
+        global cancel_requested
+        while True:
+            await asyncio.sleep(server_time_limit / 10)
+            with self.lock:
+                if self.started is not None and perf_counter() - self.started > server_time_limit:
+                    cancel_requested = True
+
+    def close(self):
+        # an expression still running stops at its next check_cancel()
+        global cancel_requested
+        cancel_requested = True
+        self.executor.shutdown(wait=False)
+
+
+def settle(future, result, error):
+    # give future the result of work done in another thread; a future that was cancelled (e.g., its client left) takes none
+    if not future.done():
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+
+async def serve_client(reader, writer, settings, user_dict, evaluator):
+    """
+    Serve one connection: one request per line, one response per line, in order, until the client closes the connection or sends "q". Expressions are evaluated by <evaluator>, an Evaluator shared by every connection.
+    """
+    session = Session(settings, user_dict)
+    try:
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                # a line longer than the reader's limit
+                writer.write(b'{"error": "request too long"}\n')
+                break
+            if not line:
+                break
+
+            request, quit = Session.parse(line), False
+            if 'error' in request:
+                response = request
+            else:
+                response, quit = await evaluator.answer(session, request)
+
+            writer.write(json.dumps(response).encode() + b'\n')
+            await writer.drain()
+            if quit:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+def serve(address, settings, user_dict, metrics_path=None):
+    """
+    Evaluate expressions for local clients until interrupted. address is a port number (TCP on 127.0.0.1) or the path of a Unix domain socket. Used for:
+
+    ada.py --serve 8750
+    ada.py --serve /tmp/ada.sock
+
+    Every connection is a separate session (see Session); many clients are served at once by one asyncio event loop, and expressions are evaluated in one worker thread, one at a time (see Evaluator). With metrics_path, metrics are saved there every 10 seconds.
+    """
+    import asyncio
+
+    globals()['input'] = no_input
+    refuse_in_server()
+
+    def client(reader, writer):
+        return serve_client(reader, writer, settings, user_dict, evaluator)
+
+    async def main():
+        nonlocal evaluator
+        evaluator = Evaluator(asyncio.get_running_loop())
+        watcher = asyncio.get_running_loop().create_task(evaluator.watch())
+        if address.isdigit():
+            server = await asyncio.start_server(client, '127.0.0.1', int(address), limit=1 << 20)
+        else:
+            server = await asyncio.start_unix_server(client, address, limit=1 << 20)
+        print('ada serving on', address, flush=True)
+        saver = asyncio.get_running_loop().create_task(save_metrics()) if metrics_path else None
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+            if saver:
+                saver.cancel()
+
+    async def save_metrics():
+        while True:
+            await asyncio.sleep(10)
+            metrics.write(metrics_path)
+
+    evaluator = None
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if evaluator:
+            evaluator.close()
+        if not address.isdigit() and os.path.exists(address):
+            os.remove(address)
+
+
+# EXPRESSION EVALUATION FUNCTIONS ====================
+
+# True once the line being evaluated has been cancelled: Ctrl-C in repl(), or the time limit in serve_client()
+cancel_requested = False
+
+
+class Cancelled(KeyboardInterrupt):
+    """
+    The line being evaluated was cancelled (see check_cancel()). A KeyboardInterrupt, so that it gets past `except Exception` and is handled as Ctrl-C is.
+    """
+
+
+def check_cancel():
+    """
+    Raise Cancelled if the line being evaluated has been cancelled. Called between the steps of anything that can run for long -- never halfway through changing the stack -- so that a cancelled line stops where rollback() can undo it. A step that runs in C (e.g., sorting a million values) finishes first.
+    """
+    if cancel_requested:
+        raise Cancelled
+
+
+def evaluate(stack, user_dict, lastx_list, mem, settings, tape, entered_value):
+    """
+    Evaluate one line of input against the stack. This is everything RPN() does with a line except reading it and drawing the register, so it is shared by the interactive calculator and batch mode. Returns a tuple whose last element is True if the line asked to quit.
+    """
+    quit = False
+
+    counters = metrics.counters
+    counters['ada_expressions_total'] += 1
+    # a line that returns early (e.g., 0x...) is measured here, on the next line
+    if len(stack) > metrics.depth:
+        metrics.depth = len(stack)
+
+    # ==========================================================
+    # HERE, WE START INITIAL PROCESSING OF entered_value
+    # ==========================================================
+
+    # if item is the name of a user-defined constant...
+    compiled = None
+    if entered_value in user_dict.keys():
+        # get the user-defined constant/expression, itself
+        entered_value = str(user_dict[entered_value][0])
+        compiled = get_compiled_expression(entered_value)
+
+    # the first two characters tell hex, binary, and octal entries apart
+    prefix = entered_value[0:2]
+
+    # run a user-defined expression from its cached, compiled form
+    if compiled:
+        counters['ada_tokens_total'] += len(compiled.steps)
+        stack, lastx_list, tape, user_dict = compiled.run(
+            stack, user_dict, lastx_list, mem, settings, tape)
+
+    # if the entered_value begins with a '#', then it's a hex number, requiring special handling
+    elif prefix[0] == '#':
+        # then this is a hex number to be converted to rgb
+        stack = hex_to_rgb(stack, entered_value)
+
+     # if entered_value is a hexadecimal value, beginning with '0x'
+    elif prefix == '0x':
+        stack = convert_hex_to_dec(stack, entered_value.split(' ')[0][2:])
+        return stack, lastx_list, tape, user_dict, settings, quit
+
+    # if entered_value is a binary number beginning with "0b"
+    elif prefix == '0b':
+        stack = convert_bin_to_dec(stack, entered_value.split(' ')[0][2:])
+        return stack, lastx_list, tape, user_dict, settings, quit
+
+    # if entered_value is an octal number beginning with "0o"
+    elif prefix == '0o':
+        stack = convert_entry(stack, entered_value.split(' ')[0][2:], 8)
+        return stack, lastx_list, tape, user_dict, settings, quit
+
+    # if entered_value is a number in any base, such as 36#zz
+    elif '#' in entered_value and based_literal.match(entered_value.split(' ')[0]):
+        base, digits = based_literal.match(entered_value.split(' ')[0]).groups()
+        if 2 <= int(base) <= 36:
+            stack = convert_entry(stack, digits, int(base))
+        else:
+            print('='*45)
+            print('Bases run from 2 to 36.')
+            print('='*45)
+        return stack, lastx_list, tape, user_dict, settings, quit
+
+    # otherwise, we're going to have to parse what the user entered
+    else:
+        # put each "item" in user's entry into a [list]
+        stack, entered_list = parse_entry(stack, entered_value)
+        # parentheses and the words taken by map, cache, h, etc. are not dispatched
+        skipped = entered_list.count('(') + entered_list.count(')')
+
+        # process each item (number, operator, shortcuts, commands, etc.) in [entered_list]
+        ndx = 0
+        while ndx < len(entered_list):
+
+            item = entered_list[ndx]
+            ndx += 1
+
+            # check_cancel(), without the call: this runs for every item
+            if cancel_requested:
+                raise Cancelled
+
+            if type(item) == float:
+                stack.push(item)
+                continue
+
+            # one lookup finds the handler for any operator, command, shortcut, or constant
+            handler = dispatch.get(item)
+
+            # 'q' (quit) and 'h' (help) are special because they are not applied to the stack
+            if handler is None:
+                stack, lastx_list, tape, user_dict = process_item(
+                    stack, user_dict, lastx_list, mem, settings, tape, item)
+            elif handler.convention == 'quit':
+                quit = True
+            elif handler.convention == 'word':
+                # map and cache take the word that follows them, if there is one
+                word = ''
+                if ndx < len(entered_list) and type(entered_list[ndx]) == str:
+                    word = entered_list[ndx]
+                    ndx += 1
+                    skipped += 1
+                stack, lastx_list, tape, user_dict = handler.function(
+                    stack, word, user_dict, lastx_list, mem, settings, tape)
+            elif handler.convention == 'help':
+                try:
+                    # h q will cause calculator to quit
+                    if entered_list[ndx] != 'q':
+                        help_fxn(stack, entered_list[ndx])
+                    else:
+                        print('='*45)
+                        print('q\nQuit calculator.')
+                        print('='*45)
+                    ndx += 1
+                    skipped += 1
+                except:
+                    # h by itself:
+                    print('='*45)
+                    print('For help with individual commands, type:')
+                    print('\nh [command]\n', sep='')
+                    print('where [command] is any command or operation.\n\nType:\n\nindex\n\nto access lists of commands and operations.', sep='')
+                    print('='*45)
+            else:
+                stack, lastx_list, tape, user_dict = handler.run(
+                    stack, user_dict, lastx_list, mem, settings, tape)
+
+        counters['ada_tokens_total'] += len(entered_list) - skipped
+        # Ctrl-C during the last item (e.g., a long stats) still undoes the line
+        check_cancel()
+
+    if len(stack) > metrics.depth:
+        metrics.depth = len(stack)
+
+    # save this item as lastx_list; retrieved by get_lastx()
+    lastx_list = [lastx_list[-1]]
+    lastx_list.append(stack[0])
+
+    return stack, lastx_list, tape, user_dict, settings, quit
+
+
+
+def process_item(stack, user_dict, lastx_list, mem, settings, tape, item):
+    """
+    Process an item from [entered_list]. Return a modified [stack].
+
+    Takes an item in entered_list -- a number, or any name in {dispatch} -- and does what it calls for. Changes to {settings} are made in place.
+    """
+
+    # if item is a float
+    if type(item) == float:
+        stack.push(item)
+        return stack, lastx_list, tape, user_dict
+
+    handler = dispatch.get(item)
+    if handler is not None:
+        return handler.run(stack, user_dict, lastx_list, mem, settings, tape)
+
+    # any unrecognized operation (a garbage entry)
+    # is ignored, the user is notified, and the program simply continues...
+    metrics.counters['ada_unknown_commands_total'] += 1
+    print('='*45)
+    err = find_error(item)
+    if err:
+        print('"', item, '"\n', err, sep='')
+    print('='*45)
+
+    return stack, lastx_list, tape, user_dict
+
+
+class Handler:
+    """
+    What to do with one name the user can type. {dispatch} maps every name to a Handler, so evaluating a name takes one dictionary lookup.
+
+    convention -- how the function is called:
+        'stack'    -- stack = function(stack)
+        'op1'      -- math_op1(): x: only (vector mode aware)
+        'op2'      -- math_op2(): x: and y: (checks division by zero)
+        'push'     -- put a constant (the function slot holds its value) on the stack
+        'lastx'    -- function(stack, lastx_list)
+        'mem'      -- function(stack, mem)
+        'user'     -- define_constant(stack, user_dict)
+        'tape'     -- tape = function(stack, tape)
+        'full'     -- (stack, lastx_list, tape, user_dict) = function(stack, user_dict, lastx_list, mem, settings, tape)
+        'settings' -- calculator_settings(settings)
+        'word'     -- (stack, lastx_list, tape, user_dict) = function(stack, word, user_dict, lastx_list, mem, settings, tape), where word is the name typed after it (map sqrt, cache off)
+        'help', 'quit', 'group' -- handled by evaluate(); '(' and ')' do nothing
+    arity -- how many stack registers the name reads, if known; otherwise None
+    """
+
+    __slots__ = ('name', 'function', 'convention', 'arity', 'run')
+
+    def __init__(self, name, function, convention, arity=None):
+        self.name = name
+        self.function = function
+        self.convention = convention
+        self.arity = arity
+        # run(stack, user_dict, lastx_list, mem, settings, tape) returns (stack, lastx_list, tape, user_dict)
+        self.run = getattr(self, '_' + convention)
+
+    def __repr__(self):
+        return 'Handler(' + repr(self.name) + ', ' + self.convention + ')'
+
+    def _stack(self, stack, user_dict, lastx_list, mem, settings, tape):
+        return self.function(stack), lastx_list, tape, user_dict
+
+    def _op1(self, stack, user_dict, lastx_list, mem, settings, tape):
+        return math_op1(stack, self.name), lastx_list, tape, user_dict
+
+    def _op2(self, stack, user_dict, lastx_list, mem, settings, tape):
+        return math_op2(stack, self.name), lastx_list, tape, user_dict
+
+    def _push(self, stack, user_dict, lastx_list, mem, settings, tape):
+        stack.push(self.function)
+        return stack, lastx_list, tape, user_dict
+
+    def _lastx(self, stack, user_dict, lastx_list, mem, settings, tape):
+        return self.function(stack, lastx_list), lastx_list, tape, user_dict
+
+    def _mem(self, stack, user_dict, lastx_list, mem, settings, tape):
+        # {mem} is changed in place
+        self.function(stack, mem)
+        return stack, lastx_list, tape, user_dict
+
+    def _user(self, stack, user_dict, lastx_list, mem, settings, tape):
+        stack, user_dict = define_constant(stack, user_dict)
+        return stack, lastx_list, tape, user_dict
+
+    def _tape(self, stack, user_dict, lastx_list, mem, settings, tape):
+        return stack, lastx_list, self.function(stack, tape), user_dict
+
+    def _full(self, stack, user_dict, lastx_list, mem, settings, tape):
+        return self.function(stack, user_dict, lastx_list, mem, settings, tape)
+
+    def _settings(self, stack, user_dict, lastx_list, mem, settings, tape):
+        settings.update(calculator_settings(settings))
+        return stack, lastx_list, tape, user_dict
+
+    def _help(self, stack, user_dict, lastx_list, mem, settings, tape):
+        # 'h' inside a group or a user-defined expression: general help
+        return help(stack), lastx_list, tape, user_dict
+
+    def _quit(self, stack, user_dict, lastx_list, mem, settings, tape):
+        return stack, lastx_list, tape, user_dict
+
+    def _word(self, stack, user_dict, lastx_list, mem, settings, tape):
+        # inside a group or a user-defined expression: no word
+        return self.function(stack, '', user_dict, lastx_list, mem, settings, tape)
+
+    _group = _quit
+
+
+def build_dispatch():
+    """
+    Build {dispatch} from {op1}, {op2}, {commands}, {shortcuts}, and {constants}. Where a name appears in more than one table, the first of those tables wins. Blank entries and '====' headings are skipped.
+    """
+    special = {
+        'lastx': 'lastx', 'user': 'user', 'tape': 'tape', 'set': 'settings',
+        'recall': 'tape', 'rerun': 'full', 'map': 'word', 'cache': 'word', 'opt': 'word', 'prof': 'word',
+        'metrics': 'word', 'save': 'word', 'load': 'word',
+        'M+': 'mem', 'M-': 'mem', 'MR': 'mem', 'MD': 'mem', 'ML': 'mem', 'MN': 'mem', 'MP': 'mem',
+        'h': 'help', 'q': 'quit',
+    }
+    mem_arity = {'M+': 2, 'M-': 2, 'MR': 1, 'MD': 2, 'ML': 0, 'MN': 1, 'MP': 1}
+
+    table = {'(': Handler('(', None, 'group', 0), ')': Handler(')', None, 'group', 0)}
+    for k, v in constants.items():
+        table[k] = Handler(k, v[0], 'push', 0)
+    for source in (shortcuts, commands):
+        for k, v in source.items():
+            if k in special:
+                table[k] = Handler(k, v[0], special[k], mem_arity.get(k))
+            elif v[0] and '====' not in k:
+                table[k] = Handler(k, v[0], 'stack')
+    for k, v in op2.items():
+        if v[0] and '====' not in k:
+            table[k] = Handler(k, v[0], 'op2', 2)
+    for k, v in op1.items():
+        if v[0] and '====' not in k:
+            table[k] = Handler(k, v[0], 'op1', 1)
+    return table
+
+
+def find_error(item):
+    """
+    If user enters something unintelligible, try to provide some help for common errors.
+    """
+    if item == 'm':
+        err = 'Commands related to memory registers\nrequire capitalization.'
+    else:
+        err = 'Unknown command.'
+    return err
+
+
+def parse_entry(stack, entered_value):
+    """
+    From the user's entered value, parse out each valid element. Put each distinct element (character/operator/number) of the user's entered_value into a list.
+
+    Example: Each of the following characters, delimited by spaces, is a single element that will be added to [entered_list]:
+
+    '( 43 62 s d dup + )' --> ['(', '43', '62', 's', 'd', 'dup', '+, ')']
+
+    This fxn has the challenge of figuring out exactly WHAT string of characters qualifies as a single item. For example, in the above expresson, "d" as a lone character is one item while the 'd' in 'dup' belongs with 'up' to form "dup" as one item.
+
+    Return entered_list to RPN().
+    """
 
-# MAIN CALCULATOR FUNCTION ====================
+    data, entered_list = [], []
+    # x:, y:, z:, and t: can only be in an entry that has a colon
+    registers = ':' in entered_value
 
-def RPN(stack, user_dict, lastx_list, mem, settings, tape):
+    # if the entered values is not a key in {op1} or {op2}...
+    if not (entered_value in op1 or entered_value in op2):
+        data = split_entry(entered_value)
+        if registers:
+            for ndx, s in enumerate(data):
+                # if item is a register on the stack, replace with stack value
+                if s in ['x:', 'y:', 'z:', 't:']:
+                    s = str(stack[0]) if s == 'x:' else s
+                    s = str(stack[1]) if s == 'y:' else s
+                    s = str(stack[2]) if s == 'z:' else s
+                    s = str(stack[3]) if s == 't:' else s
+                    data[ndx] = s
+
+    else:
+        entered_list.append(entered_value)
+
+    # in case x:, y:, z:, t: are used, the values in those registers now reside in entered_value, so delete them from the stack
+    if registers:
+        for ndx, r in enumerate(['x:', 'y:', 'z:', 't:']):
+            if r in entered_value:
+                stack[ndx] = 0.0
+
+    # convert numbers to floats and strip out punctuation (a lone ':' is the only one split_entry() keeps)
+    for i in data:
+        if i == ':':
+            continue
+        # only try float() on what can be a number: a failed float() raises, and that costs more than the rest of this loop
+        if i[0] in number_starts and i != '-' or i.lower() in number_words:
+            try:
+                entered_list.append(float(i))
+                continue
+            except ValueError:
+                pass
+        entered_list.append(i)
+
+    return stack, entered_list
+
+
+# the first characters of a token that float() can take, and the words it takes (a register replaced by its value can be nan or inf, too)
+number_starts = frozenset('0123456789-.')
+number_words = frozenset(['inf', 'infinity', 'nan'])
+
+
+def split_entry(entered_value):
     """
-    Main function that gets user's input and does initial processing. This means that some inputs can be handled easily, but most will require further processing by process_item() which will return a [list] of individual items that the user entered.
+    Break entered_value into raw strings: numbers, names, operators, parentheses, and register names (x:, y:, ...). Registers are not replaced by their values here; that is up to the caller.
+
+    One pass of {token_pattern}; characters that belong to no token (spaces, commas, ...) are dropped.
     """
 
-    while True:
-        quit = False
+    return token_pattern.findall(entered_value)
 
-        # print the tape if requested in {settings}
-        if settings['show_tape'] == 'Y':
-            print_tape(stack, tape)
 
-        # print the register
-        stack = print_register(stack, settings)
+def build_tokenizer():
+    """
+    Compile the regular expression that split_entry() uses. Alternatives are tried in order at each position:
 
-        # generate the menu
-        if settings['show_menu'] == 'Y':
-            print()
-            for i in range(0, len(menu), 4):
-                m = ''.join(menu[i:i+4])
-                print(m)
-
-        # print user tip, optionally
-        if settings['show_tips'] == 'Y':
-            print('\nType:\n     basics\nto get started with RPN.')
-            # only show tip once
-            settings['show_tips'] = 'N'
-
-        # get the command line entry from the user
-        entered_value = input('').lstrip().rstrip()
-
-        # make sure parentheses are balanced before proceeding
-        lst = list(entered_value)
-        if lst.count('(') - lst.count(')') != 0:
-            print('Unbalanced parentheses.')
-            continue
+        '(' or ')'
+        a number in scientific notation, e.g., 1.5e-9 or -2E+3
+        a run of digits, '-', and '.', e.g., 42, -3.5 (a run like 3-2 stays one item, and is reported as an error)
+        M+, M-, MD, ML, MN, MP, MR
+        a name: one letter, '_', or ':' followed by lowercase letters, '_', or ':', e.g., dup, x:, Sum
+        a one-character operator from {op2}, or '!'
+    """
 
-        # add the current expression to the tape
-        tape.append(entered_value)
+    operators = sorted(k for k in op2 if len(k) == 1 and k not in letters + digits + '-.') + ['!']
+    return re.compile(r"""
+        [()]
+        | -?(?:[0-9]+\.?[0-9]*|\.[0-9]+)[eE][-+]?[0-9]+(?![-.0-9])
+        | [-.0-9]+
+        | M[-+DLNPR]
+        | [A-Za-z_:][a-z_:]*
+        | [""" + ''.join(re.escape(k) for k in operators) + """]
+        """, re.VERBOSE)
 
-        # if <ENTER> alone was pressed, duplicate the x: value on the stack and then <continue>
-        if len(entered_value) == 0:
-            x = stack[0]
-            stack.insert(0, x)
-            continue
 
-        # ==========================================================
-        # HERE, WE START INITIAL PROCESSING OF entered_value
-        # ==========================================================
+# COMPILED USER-DEFINED EXPRESSIONS ====================
 
-        # if item is the name of a user-defined constant...
-        if entered_value in user_dict.keys():
-            # get the user-defined constant/expression, itself
-            entered_value = str(user_dict[entered_value][0])
+# compiled forms of user-defined expressions, keyed on the expression text
+compiled_expressions = {}
 
-        # if the entered_value begins with a '#', then it's a hex number, requiring special handling
-        if entered_value[0] == '#':
-            # then this is a hex number to be converted to rgb
-            stack = hex_to_rgb(stack, entered_value)
 
-         # if entered_value is a hexadecimal value, beginning with '0x'
-        elif entered_value[0:2] == '0x':
-            stack = convert_hex_to_dec(stack, entered_value.split(' ')[0][2:])
-            continue
+class CompiledExpression:
+    """
+    A user-defined expression that has already been through parse_entry() and had each item matched to the function that handles it, so running it again skips the parser and the if-chain in process_item().
+
+    Each step is a (kind, target) pair:
+
+        'push'     -- put target (a number or constant) on the stack
+        'register' -- put the value that register #target held when the expression started on the stack
+        'stack'    -- target is a function that only needs the stack
+        'handler'  -- target is the item's Handler from {dispatch}
+        'item'     -- an unknown name; target is handed to process_item()
+
+
+    optimized -- the expression as it runs, after fold_tokens(): the same as text if there was nothing to fold
+    reads -- how many stack registers the expression reads, if it uses only operations in {pure_effects}; otherwise None, and its results are never cached
+    """
+
+    __slots__ = ('text', 'registers', 'steps', 'optimized', 'reads')
+
+    def __init__(self, text, registers, steps, optimized=None):
+        self.text = text
+        self.registers = registers
+        self.steps = steps
+        self.optimized = text if optimized is None else optimized
+        self.reads = stack_reads(steps, registers)
+
+    def run(self, stack, user_dict, lastx_list, mem, settings, tape):
+        if verify_optimizer and self.optimized != self.text:
+            return verify_run(self, stack, user_dict, lastx_list, mem, settings, tape)
+        if self.reads is not None and result_cache.enabled:
+            return result_cache.run(self, stack, user_dict, lastx_list, mem, settings, tape)
+        return self.run_steps(stack, user_dict, lastx_list, mem, settings, tape)
+
+    def run_steps(self, stack, user_dict, lastx_list, mem, settings, tape):
+        # registers are read before anything runs, then cleared, exactly as parse_entry() does
+        if self.registers:
+            values = [float(stack[ndx]) for ndx in range(4)]
+            for ndx in self.registers:
+                stack[ndx] = 0.0
+
+        for kind, target in self.steps:
+            if kind == 'stack':
+                stack = target(stack)
+            elif kind == 'push':
+                stack.push(target)
+            elif kind == 'register':
+                stack.push(values[target])
+            elif kind == 'handler':
+                stack, lastx_list, tape, user_dict = target.run(
+                    stack, user_dict, lastx_list, mem, settings, tape)
+            else:
+                stack, lastx_list, tape, user_dict = process_item(
+                    stack, user_dict, lastx_list, mem, settings, tape, target)
+
+        return stack, lastx_list, tape, user_dict
+
+
+def compile_expression(text, optimize=True):
+    """
+    Compile a user-defined expression into a CompiledExpression, optimized by fold_tokens() unless optimize is False. Returns None for expressions that evaluate() has to handle itself: hex/binary/octal/base#digits/color entries and expressions that use q, h, map, cache, or opt.
+    """
+    if text[0] == '#' or text[0:2] in ['0x', '0b', '0o'] or based_literal.match(text.split(' ')[0]):
+        return None
+
+    if text in op1.keys() or text in op2.keys():
+        data = [text]
+    else:
+        data = split_entry(text)
+    if optimize:
+        data = fold_tokens(data)
 
-        # if entered_value is a binary number beginning with "0b"
-        elif entered_value[0:2] == '0b':
-            stack = convert_bin_to_dec(stack, entered_value.split(' ')[0][2:])
+    registers = [ndx for ndx, r in enumerate(['x:', 'y:', 'z:', 't:']) if r in text]
+
+    steps = []
+    for i in data:
+        if i in ['x:', 'y:', 'z:', 't:']:
+            steps.append(('register', ['x:', 'y:', 'z:', 't:'].index(i)))
+            continue
+        if i in [',', ';', ':'] or not i.rstrip() or i in ['(', ')']:
+            continue
+        try:
+            steps.append(('push', float(i)))
             continue
+        except ValueError:
+            pass
 
-        # otherwise, we're going to have to parse what the user entered
+        handler = dispatch.get(i)
+        if handler is None:
+            # unknown names: process_item() reports the error
+            steps.append(('item', i))
+        elif handler.convention in ['help', 'quit', 'word']:
+            return None
+        elif handler.convention == 'stack':
+            steps.append(('stack', handler.function))
+        elif handler.convention == 'push':
+            steps.append(('push', handler.function))
         else:
-            # put each "item" in user's entry into a [list]
-            stack, entered_list = parse_entry(stack, entered_value)
+            steps.append(('handler', handler))
 
-            # process each item (number, operator, shortcuts, commands, etc.) in [entered_list]
-            ndx = 0
-            while ndx < len(entered_list):
+    return CompiledExpression(text, registers, steps, ' '.join(data) if optimize else text)
 
-                item = entered_list[ndx]
 
-                # process shortcuts
-                # 'q' (quit) is special because it does not have a fxn
-                if item in shortcuts.keys():
-                    if item == 'q':
-                        quit = True
-                    elif item == 'h':
-                        try:
-                            # h q will cause calculator to quit
-                            if entered_list[ndx+1] != 'q':
-                                help_fxn(stack, entered_list[ndx+1])
-                                ndx += 1
-                            else:
-                                print('='*45)
-                                print('q\nQuit calculator.')
-                                print('='*45)
-                                entered_list[ndx+1] = ''
-                                ndx += 1
-                        except:
-                            # h by itself:
-                            print('='*45)
-                            print('For help with individual commands, type:')
-                            print('\nh [command]\n', sep='')
-                            print('where [command] is any command or operation.\n\nType:\n\nindex\n\nto access lists of commands and operations.', sep='')
-                            print('='*45)
-                    else:
-                        operation = shortcuts[item][0]
-                        stack = operation(stack)
-
-                # process all items except shortcuts and things that start with '('
-                elif item != '(' and item not in shortcuts.keys():
-                    # settings has to be handled differently
-                    if item == 'set':
-                        settings = calculator_settings(settings)
-                    else:
-                        stack, lastx_list, tape, user_dict = process_item(
-                            stack, user_dict, lastx_list, mem, settings, tape, item)
-                    ndx += 1
-                    continue
+def get_compiled_expression(text):
+    """
+    Return the cached CompiledExpression for text, compiling it on first use.
+    """
+    if text not in compiled_expressions:
+        compiled_expressions[text] = compile_expression(text)
+    return compiled_expressions[text]
 
-                # if '(', then this is the start of a group; a result is obtained for each group
-                elif item == '(':
-                    while item != ')':
-                        stack, lastx_list, tape, user_dict = process_item(
-                            stack, user_dict, lastx_list, mem, settings, tape, item)
-                        ndx += 1
-                        if ndx < len(entered_list):
-                            try:
-                                item = entered_list[ndx]
-                            except:
-                                pass
-                        continue
-                else:
-                    pass
 
-                ndx += 1
+# EXPRESSION OPTIMIZER ====================
 
-        # save this item as lastx_list; retrieved by get_lastx()
-        lastx_list = [lastx_list[-1]]
-        lastx_list.append(stack[0])
+# pairs of operations that cancel out: (function name, function name)
+identities = {('swap', 'swap'), ('dup', 'drop'), ('negate', 'negate')}
 
-        if quit:
-            # save {settings} to disk before quitting
-            with open('config.json', 'w+') as file:
-                file.write(json.dumps(settings, ensure_ascii=False))
-            print('\nEnd program.\n')
-            return None
+# operations fold_tokens() may do ahead of time: cheap, and none of them raises, whatever the numbers. Not factorial or ^ (which can take long, or overflow), log, ceil, floor, or the trig functions other than atan (which reject some numbers, e.g., inf), % (which can divide by zero), or round_y
+foldable = {
+    'absolute', 'negate', 'square_root', 'atan', 'deg', 'rad',
+    'ic', 'ci', 'ftoc', 'ctof', 'go', 'og', 'kp', 'pk', 'km', 'mk',
+    'add', 'sub', 'mul', 'truediv', 'pi', 'swap', 'dup', 'drop',
+    }
 
-    return stack
+# True while "opt verify" is on: optimized expressions are checked against the unoptimized expression every time they run
+verify_optimizer = False
 
-# EXPRESSION EVALUATION FUNCTIONS ====================
 
-def process_item(stack, user_dict, lastx_list, mem, settings, tape, item):
+def fold_tokens(tokens):
     """
-    Process an item from [entered_list]. Return a modified [stack] (or modified {settings}).
+    Optimize the items of a user-defined expression, once, when it is compiled:
 
-    Takes an item in entered_list, which is going to be anything except a shortcut, and figures out what to do with it.
+    -- an operation in {foldable} whose inputs are all numbers or constants is done now, and its result replaces it and its inputs: "(150 140 -) 2 / 140 +" becomes "145.0"
+    -- pairs of operations that cancel out ({identities}, e.g., "s s" or "dup d") are removed
+    -- parentheses and separators, which do nothing, are dropped
+
+    An operation that would print something (e.g., "1 0 /": "Cannot divide by zero.") is left as it is, so that it still prints when the expression runs. Returns the optimized list of items.
     """
+    import contextlib
+    import io
 
-    # if it's a '(' or ')', we have the start or end of a group; do nothing
-    if item in ['(', ')']:
-        pass
+    folded = []
+    for token in tokens:
+        if token in [',', ';', ':', '(', ')'] or not token.rstrip():
+            continue
 
-    # if item is a float
-    elif type(item) == float:
-        stack.insert(0, item)
-
-    # if item is a math operator only requiring x:
-    elif item in op1:
-        stack = math_op1(stack, item)
-
-    # if item is a math operator requiring both x: and y:
-    elif item in op2:
-        stack = math_op2(stack, item)
-
-    # if operator is in {commands}, {shortcuts}, or {constants}
-    elif item in commands or item in shortcuts or item in constants:
-
-        # default code that runs:
-        #      operation(stack)
-        #      stack = operation(stack)
-        if item in commands:
-            operation = commands[item][0]
-        elif item in shortcuts:
-            operation = shortcuts[item][0]
-        elif item in constants:
-            stack.insert(0, constants[item][0])
-
-        # following are items that have to be handled differently
-        if item == 'lastx':
-            stack = operation(stack, lastx_list)
-        elif item == 'user':
-            stack, user_dict = define_constant(stack, user_dict)
-        elif item in ['M+', 'M-', 'MD', 'MR', 'ML']:
-            mem = operation(stack, mem)
-        elif item == 'set':
-            settings = operation(settings)
-            return settings
-        elif item == 'tape':
-            tape = print_tape(stack, tape)
-        else:
-            if item not in constants:
-                stack = operation(stack)
+        handler = dispatch.get(token)
+        function = getattr(handler, 'function', None)
+        effect = pure_effects.get(getattr(function, '__name__', None))
+        if effect is None or handler.convention not in ['op1', 'op2', 'stack']:
+            folded.append(token)
+            continue
 
-    # any unrecognized operation (a garbage entry)
-    # is ignored, the user is notified, and the program simply continues...
-    else:
+        pops, pushes = effect
+        inputs = [literal_value(t) for t in folded[len(folded) - pops:]] if len(folded) >= pops else [None]
+        if None not in inputs and function.__name__ in foldable:
+            # a zero under the inputs, so that operations that only push (pi) have an x: to look at
+            scratch, output = Stack(reversed([0.0] + inputs)), io.StringIO()
+            try:
+                with contextlib.redirect_stdout(output):
+                    scratch, _, _, _ = handler.run(scratch, {}, [0.0], None, {}, None)
+            except Exception:
+                output.write('error')
+            results = scratch[:pushes]
+            if not output.getvalue() and len(scratch) == pushes + 1 and all(type(v) is float for v in results):
+                del folded[len(folded) - pops:]
+                folded.extend(repr(v) for v in reversed(results))
+                continue
+
+        previous = getattr(getattr(dispatch.get(folded[-1]), 'function', None), '__name__', None) if folded else None
+        if (previous, function.__name__) in identities:
+            folded.pop()
+            continue
+        folded.append(token)
+    return folded
+
+
+def literal_value(token):
+    # the number that token pushes, if it is a number or a constant; otherwise None
+    try:
+        return float(token)
+    except ValueError:
+        handler = dispatch.get(token)
+        if handler is not None and handler.convention == 'push':
+            return float(handler.function)
+        return None
+
+
+def verify_run(compiled, stack, user_dict, lastx_list, mem, settings, tape):
+    """
+    Run an optimized expression, after running the expression as written on a copy of the stack, and report any difference between the two. Used while "opt verify" is on. Expressions that aren't pure math (e.g., rand) can't be compared, and simply run.
+    """
+    import contextlib
+    import io
+
+    reference = compile_expression(compiled.text, optimize=False)
+    if reference.reads is None or vector_mode:
+        return compiled.run_steps(stack, user_dict, lastx_list, mem, settings, tape)
+
+    expected = stack.copy()
+    with contextlib.redirect_stdout(io.StringIO()):
+        expected, _, _, _ = reference.run_steps(expected, user_dict, list(lastx_list), mem, settings, tape)
+    stack, lastx_list, tape, user_dict = compiled.run_steps(stack, user_dict, lastx_list, mem, settings, tape)
+
+    # nan is not equal to itself, but two nans are the same result
+    if len(expected) != len(stack) or any(e != v and not (e != e and v != v) for e, v in zip(expected, stack)):
         print('='*45)
-        err = find_error(item)
-        if err:
-            print('"', item, '"\n', err, sep='')
+        print('Optimized expression gave a different result:')
+        print('  ', compiled.text, '-->', expected[0] if len(expected) else 'empty stack')
+        print('  ', compiled.optimized, '-->', stack[0] if len(stack) else 'empty stack')
         print('='*45)
-
     return stack, lastx_list, tape, user_dict
 
 
-def find_error(item):
+def optimize_command(stack, word, user_dict, lastx_list, mem, settings, tape):
     """
-    If user enters something unintelligible, try to provide some help for common errors.
+    User-defined expressions are optimized when they are saved (or first used): math on numbers alone is done once, ahead of time, and operations that cancel out (such as "s s" or "dup d") are removed.
+
+Example:
+    (150 140 -) 2 / 140 + --> runs as: 145.0
+
+Usage:
+    opt         --> list user-defined expressions, with the form that runs
+    opt verify  --> verification on/off: each time an optimized expression runs, check its result against the expression as written
     """
-    if item == 'm':
-        err = 'Commands related to memory registers\nrequire capitalization.'
-    else:
-        err = 'Unknown command.'
-    return err
+    global verify_optimizer
+
+    if word == 'verify':
+        verify_optimizer = not verify_optimizer
+    elif word:
+        print('='*45)
+        print('Usage: opt [verify]')
+        print('='*45)
+        return stack, lastx_list, tape, user_dict
+
+    print('='*45)
+    for name, v in user_dict.items():
+        value = v[0]
+        compiled = get_compiled_expression(value) if type(value) == str else None
+        if compiled:
+            print(name, ': ', value, sep='')
+            if compiled.optimized != value:
+                print('    runs as: ', compiled.optimized or '(nothing)', sep='')
+    print('Verification:', 'on' if verify_optimizer else 'off')
+    print('='*45)
+    return stack, lastx_list, tape, user_dict
 
 
-def parse_entry(stack, entered_value):
+# RESULT CACHE ====================
+
+# operations whose result depends only on the registers they read, and that do nothing else (unless they print an error):
+# function name: (registers read and removed, values put back)
+pure_effects = dict(
+    {name: (1, 1) for name in [
+        'absolute', 'ceil', 'floor', 'log', 'negate', 'square_root', 'factorial', 'sin', 'cos', 'tan',
+        'asin', 'acos', 'atan', 'deg', 'rad', 'ic', 'ci', 'ftoc', 'ctof', 'go', 'og', 'kp', 'pk', 'km', 'mk']},
+    **{name: (2, 1) for name in ['add', 'sub', 'mul', 'truediv', 'mod', 'pow', 'round_y']},
+    pi=(0, 1), swap=(2, 2), dup=(1, 2), drop=(1, 0),
+    )
+
+
+def stack_reads(steps, registers):
     """
-    From the user's entered value, parse out each valid element. Put each distinct element (character/operator/number) of the user's entered_value into a list.
+    How deep into the stack a compiled expression reaches: the number of registers it reads, counting from x:. None if any step is not in {pure_effects} (rand, memory, the tape, printing, ...), or if the expression has no operations at all, so there would be nothing to save.
+    """
+    depth = lowest = 0
+    operations = 0
+    for kind, target in steps:
+        if kind in ['push', 'register']:
+            depth += 1
+            continue
+        function = target if kind == 'stack' else getattr(target, 'function', None)
+        effect = pure_effects.get(getattr(function, '__name__', None))
+        if effect is None or (kind == 'handler' and target.convention not in ['op1', 'op2']):
+            return None
+        depth -= effect[0]
+        lowest = min(lowest, depth)
+        depth += effect[1]
+        operations += 1
 
-    Example: Each of the following characters, delimited by spaces, is a single element that will be added to [entered_list]:
+    if not operations:
+        return None
+    # x:, y:, z:, and t: are all read (and cleared) when any of them is used
+    return max(-lowest, 4 if registers else 0)
 
-    '( 43 62 s d dup + )' --> ['(', '43', '62', 's', 'd', 'dup', '+, ')']
 
-    This fxn has the challenge of figuring out exactly WHAT string of characters qualifies as a single item. For example, in the above expresson, "d" as a lone character is one item while the 'd' in 'dup' belongs with 'up' to form "dup" as one item.
+class ResultCache:
+    """
+    Results of user-defined expressions that use only pure operations (see {pure_effects}), keyed on the expression and the values of the registers it reads. Running a cached expression again on the same values replaces those registers with the saved results instead of doing the work. When the cache holds <size> results, the least recently used is dropped.
 
-    Return entered_list to RPN().
+    An expression that prints anything (e.g., "Cannot divide by zero.") is not cached, so the message is shown every time. Only real numbers are used as keys; series (vector mode) are always computed.
     """
 
-    data, j, entered_list, s = [], 0, [], ''
+    __slots__ = ('results', 'size', 'enabled', 'hits', 'misses')
 
-    # if the entered values is not a key in {op1} or {op2}...
-    if not (entered_value in op1.keys() or entered_value in op2.keys()):
-        ndx = -1
-        while True:
+    def __init__(self, size=1024):
+        self.results = OrderedDict()
+        self.size = size
+        self.enabled = True
+        self.hits = self.misses = 0
 
-            ndx += 1
-            if ndx >= len(entered_value):
-                break
+    def run(self, compiled, stack, user_dict, lastx_list, mem, settings, tape):
+        reads = compiled.reads
+        if len(stack) < reads:
+            return compiled.run_steps(stack, user_dict, lastx_list, mem, settings, tape)
+        inputs = tuple(stack[ndx] for ndx in range(reads))
+        if not all(type(value) is float for value in inputs):
+            return compiled.run_steps(stack, user_dict, lastx_list, mem, settings, tape)
 
-            # if it's an open or a closed parenthesis
-            if entered_value[ndx] in ['(', ')']:
-                s = entered_value[ndx]
+        key = (compiled.text, inputs)
+        results = self.results.get(key)
+        if results is not None:
+            self.hits += 1
+            self.results.move_to_end(key)
+            for _ in range(reads):
+                stack.pop()
+            for value in results:
+                stack.push(value)
+            return stack, lastx_list, tape, user_dict
 
+        import contextlib
+        import io
 
-            # if it's a number, gather all the following digits into one string
-            elif entered_value[ndx] in digits or entered_value[ndx] == '-' or entered_value[ndx] == '.':
-                while entered_value[ndx] in digits or entered_value[ndx] == '-' or entered_value[ndx] == '.':
-                    s += entered_value[ndx]
-                    try:
-                        if entered_value[ndx+1] in digits or entered_value[ndx+1] == '-' or entered_value[ndx+1] == '.':
-                            ndx += 1
-                        else:
-                            break
-                    except IndexError:
-                        break
+        self.misses += 1
+        below = len(stack) - reads
+        output = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(output):
+                stack, lastx_list, tape, user_dict = compiled.run_steps(
+                    stack, user_dict, lastx_list, mem, settings, tape)
+        finally:
+            print(output.getvalue(), end='')
+
+        if not output.getvalue() and len(stack) >= below:
+            # the values above the registers the expression read, deepest first
+            self.results[key] = tuple(stack[ndx] for ndx in reversed(range(len(stack) - below)))
+            if len(self.results) > self.size:
+                self.results.popitem(last=False)
+        return stack, lastx_list, tape, user_dict
+
+    def clear(self):
+        self.results.clear()
+        self.hits = self.misses = 0
+
+
+def cache_command(stack, word, user_dict, lastx_list, mem, settings, tape):
+    """
+    Results of user-defined expressions that only do math are saved, so running one again on the same values of x:, y:, ... doesn't do the work again. Expressions that use rand, memory registers, the tape, or anything else that does more than math are always run.
+
+Usage:
+    cache        --> show how often saved results were used
+    cache off    --> stop saving results (and forget saved ones)
+    cache on     --> start saving results again
+    cache clear  --> forget saved results and reset the counts
+    """
+    if word == 'on':
+        result_cache.enabled = True
+    elif word == 'off':
+        result_cache.enabled = False
+        result_cache.clear()
+    elif word == 'clear':
+        result_cache.clear()
+    elif word:
+        print('='*45)
+        print('Usage: cache [on/off/clear]')
+        print('='*45)
+        return stack, lastx_list, tape, user_dict
 
-            # if it's a alphabetic character, gather all the following characters into one string
-            elif entered_value[ndx] in letters:
-                while entered_value[ndx] in letters:
-                    s += entered_value[ndx]
-                    try:
-                        if entered_value[ndx+1] in lower_letters:
-                            ndx += 1
-                        elif entered_value[ndx] == 'M' and entered_value[ndx+1] in ['+', '-', 'D', 'L', 'R']:
-                            s += entered_value[ndx+1]
-                            ndx += 1
-                            break
-                        else:
-                            break
-                    except IndexError:
-                        break
+    lookups = result_cache.hits + result_cache.misses
+    print('='*45)
+    print('Result cache:', 'on' if result_cache.enabled else 'off')
+    print('        Hits:', result_cache.hits)
+    print('      Misses:', result_cache.misses)
+    print('    Hit rate: {:.1%}'.format(result_cache.hits / lookups if lookups else 0))
+    print('       Saved: {} of {}'.format(len(result_cache.results), result_cache.size))
+    print('='*45)
+    return stack, lastx_list, tape, user_dict
 
-            # if it's a single-character math operator (all of {op2]
-            # and only '!' in {op1})
-            elif entered_value[ndx] in op2.keys() or entered_value[ndx] == '!':
-                if s == '-':
-                    break
-                s += entered_value[ndx]
 
-            # if item is a register on the stack, replace with stack value
-            if s in ['x:', 'y:', 'z:', 't:']:
-                s = str(stack[0]) if s == 'x:' else s
-                s = str(stack[1]) if s == 'y:' else s
-                s = str(stack[2]) if s == 'z:' else s
-                s = str(stack[3]) if s == 't:' else s
+result_cache = ResultCache()
 
-            data.append(s)
-            s = ''
 
-    else:
-        entered_list.append(entered_value)
+# PROFILER ====================
 
-    # in case x:, y:, z:, t: are used, the values in those registers now reside in entered_value, so delete them from the stack
-    for ndx, r in enumerate(['x:', 'y:', 'z:', 't:']):
-        if r in entered_value:
-            stack[ndx] = 0.0
+class Profiler:
+    """
+    Times every operation the user runs, and the phases of handling a line: parsing it, evaluating it, and drawing the prompt afterwards. Used by the prof command.
 
-    # convert numbers to floats and strip out empty elements  and punctuation(e.g., commas, as in, comma delimited number sequences)
-    for i in data:
-        if i in [',', ';', ':']:
-            i = ' '
-        if i.rstrip() or i in ['(', ')']:
+    Turning the profiler on replaces each Handler's run() in {dispatch} with a timed version, and the phase functions (module globals) with timed versions; turning it off puts the originals back. Nothing is timed, and nothing costs anything, while it is off.
+    """
+
+    # phase name: the module-level function that does it
+    phases = {'parse': 'parse_entry', 'evaluate': 'evaluate', 'render': 'print_prompt'}
+
+    def __init__(self):
+        self.enabled = False
+        # name: [calls, total nanoseconds]
+        self.operations, self.phase_times = {}, {}
+
+    def on(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        self.operations.clear()
+        self.phase_times.clear()
+        for handler in dispatch.values():
+            handler.run = self.timed(handler.run, handler.name, self.operations)
+        for phase, name in self.phases.items():
+            globals()[name] = self.timed(globals()[name], phase, self.phase_times)
+
+    def off(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        for handler in dispatch.values():
+            handler.run = getattr(handler, '_' + handler.convention)
+        for phase, name in self.phases.items():
+            globals()[name] = globals()[name].__wrapped__
+
+    @staticmethod
+    def timed(function, name, times):
+        from time import perf_counter_ns
+
+        def run(*args):
+            start = perf_counter_ns()
             try:
-                entered_list.append(float(i))
-            except:
-                entered_list.append(i)
+                return function(*args)
+            finally:
+                elapsed = perf_counter_ns() - start
+                entry = times.get(name)
+                if entry is None:
+                    times[name] = [1, elapsed]
+                else:
+                    entry[0] += 1
+                    entry[1] += elapsed
 
-    return stack, entered_list
+        run.__wrapped__ = function
+        return run
+
+    def report(self, top=10):
+        print('='*45)
+        print('{:<14} {:>8} {:>10} {:>10}'.format('phase', 'calls', 'total ms', 'mean us'))
+        for phase in self.phases:
+            calls, total = self.phase_times.get(phase, (0, 0))
+            print('{:<14} {:>8,} {:>10.3f} {:>10.1f}'.format(phase, calls, total / 1e6, total / calls / 1e3 if calls else 0))
+        print()
+        print('{:<14} {:>8} {:>10} {:>10}'.format('operation', 'calls', 'total ms', 'mean us'))
+        hottest = sorted(self.operations.items(), key=lambda item: item[1][1], reverse=True)[:top]
+        for name, (calls, total) in hottest:
+            print('{:<14} {:>8,} {:>10.3f} {:>10.1f}'.format(name, calls, total / 1e6, total / calls / 1e3))
+        if not hottest:
+            print('(nothing timed yet)')
+        print('Profiler:', 'on' if self.enabled else 'off')
+        print('='*45)
+
+
+def profile_command(stack, word, user_dict, lastx_list, mem, settings, tape):
+    """
+    Find out where the time goes: how long parsing, evaluating, and drawing the stack take, and which operations take the most time.
+
+Usage:
+    prof on      --> start timing (and forget earlier timings)
+    prof off     --> stop timing; the timings are kept
+    prof report  --> show the phases and the 10 operations that took the most time, with calls, total time, and mean time per call
+    prof         --> same as prof report
+
+Evaluating includes parsing; an operation that runs others (e.g., rerun) includes their time.
+    """
+    if word == 'on':
+        profiler.on()
+        print('Profiler on.')
+    elif word == 'off':
+        profiler.off()
+        print('Profiler off.')
+    elif word in ['', 'report']:
+        profiler.report()
+    else:
+        print('='*45)
+        print('Usage: prof [on/off/report]')
+        print('='*45)
+    return stack, lastx_list, tape, user_dict
+
+
+profiler = Profiler()
 
 
 def print_register(stack, settings):
@@ -349,80 +2046,268 @@ def print_register(stack, settings):
     print()
 
     # stack must always have at least 4 elements
-    while len(stack) < 4:
-        stack.insert(len(stack), 0.0)
+    stack.pad(4)
 
-    # make sure the stack contains only numbers
-    stk = list(reversed(stack))
-    for ndx, i in enumerate(stk):
-        try:
-            r = int(i)
-        except ValueError:
-            stk.pop(ndx)
-    stack = list(reversed(stk))
+    # the stack holds only numbers (a result that isn't one is nan; see Stack.push()), so only the four registers shown are looked at
+    fixed, scientific = register_formats(settings['dec_point'], settings['separator'])
 
     # format and print the four registers
     for register in range(3, -1, -1):
-        # get the number of decimals and the thousands separator from {settings}
-        dp = settings['dec_point']
-        separator = settings['separator']
+        value = stack[register]
 
-        # set the formatting of the numbers
-        if (stack[register] > 1e7 or
-                stack[register] < -1 * 1e6) and (stack[register] != 0.0):
-            # switch to scientific notation
-            fs = ('{:'+ separator + '.0' + dp + 'e}').format(stack[register])
+        # a series (vector mode) is shown by its length
+        if is_vector(value):
+            print(stack_names[register], ':', '{:>16}'.format(
+                '[{:,} values]'.format(len(value))), sep='')
+            continue
+
+        # set the formatting of the numbers: scientific notation for large values
+        if (value > 1e7 or value < -1 * 1e6) and (value != 0.0):
+            fs = scientific(finite_or_inf(value))
         else:
-            # switch to regular number notation
-            fs = ('{:' + separator + '.0' + dp + 'f}').format(stack[register])
+            fs = fixed(value)
+
+        # line up decimal points, and print the register
+        p = 11 + len(fs) - fs.find('.')
+        print(stack_names[register], ':', fs.rjust(p), sep='')
+
+    return stack
+
+
+def register_formats(dec_point, separator=''):
+    """
+    Return the (fixed-point, scientific) formatting functions for a number of decimal places and a thousands separator, as set in {settings}. Each pair is built once and kept in {register_formatters}; changing the settings just selects another pair.
+    """
+    key = (dec_point, separator)
+    formats = register_formatters.get(key)
+    if formats is None:
+        formats = (('{:' + separator + '.0' + dec_point + 'f}').format,
+                   ('{:' + separator + '.0' + dec_point + 'e}').format)
+        register_formatters[key] = formats
+    return formats
+
+
+# (dec_point, separator): (fixed-point, scientific) formatting functions; see register_formats()
+register_formatters = {}
+
+
+def finite_or_inf(value):
+    """
+    value, or inf (with its sign) for an exact integer too large to format as a float.
+    """
+    if type(value) is int and value.bit_length() > 1023:
+        return math.inf if value > 0 else -math.inf
+    return value
+
+
+#  IMPORT FILE FUNCTIONS ====================
+
+def get_file_data(stack):
+    """
+    Import a text file and put the data on the stack.
+
+Since the stack is only a list of numbers, the file that you import should contain only one column of numbers. Lines that don't contain numbers will be skipped.
+    """
+    data_file = input('File name: ')
+
+    # read the data file
+    start = perf_counter()
+    try:
+        values, lines, cnt = read_numbers(data_file)
+
+    # notify user if no file was found
+    except FileNotFoundError:
+        print('='*45)
+        print('File not found. Stack unmodified.')
+        print('='*45)
+        return stack
+
+    # in vector mode, the file becomes one series in x:; otherwise it replaces the stack
+    if vector_mode:
+        stack.push(numpy.frombuffer(values, dtype=float))
+    elif compact_mode:
+        stack = Stack.from_array(values)
+    else:
+        stack = Stack(values)
+    metrics.observe('ada_import_seconds', perf_counter() - start)
+
+    # provide a report to the user
+    print('='*18, ' REPORT ', '='*19, sep='')
+    print('   Lines in file:', lines)
+    print('Numbers imported:', cnt)
+    print('='*45, sep='')
+
+    return stack
+
+
+def read_numbers(data_file, chunk_size=1 << 20):
+    """
+    Read a one-column file of numbers in chunks of <chunk_size> bytes, so that only one chunk of text is in memory at a time. Numbers go straight into an array of doubles (8 bytes each). Any line that is not a number is skipped.
+
+    Returns the array, the number of lines in the file, and the number of values read. For large files, shows how far the import has gotten.
+    """
+    values, lines, remainder = array('d'), 0, b''
+
+    with open(data_file, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        show_progress, done, percent = size >= 64 * chunk_size, 0, -1
+
+        while True:
+            check_cancel()
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            done += len(chunk)
+
+            # the last line in a chunk is usually incomplete; carry it into the next chunk
+            chunk = chunk.split(b'\n')
+            chunk[0] = remainder + chunk[0]
+            remainder = chunk.pop()
+            lines += len(chunk)
+
+            # float() accepts bytes and ignores surrounding whitespace (including '\r')
+            for line in chunk:
+                try:
+                    value = float(line)
+                except ValueError:
+                    continue
+                # nan is not a number that can go on the stack
+                if value == value:
+                    values.append(value)
+
+            if show_progress and done * 100 // size != percent:
+                percent = done * 100 // size
+                print('\rImporting... ', percent, '%', sep='', end='', flush=True)
+
+        # a last line without a newline at the end
+        if remainder:
+            lines += 1
+            try:
+                value = float(remainder)
+                if value == value:
+                    values.append(value)
+            except ValueError:
+                pass
+
+    if show_progress:
+        print()
+
+    return values, lines, len(values)
+
+
+# STACK SNAPSHOTS ====================
+
+# a snapshot file is a header -- struct format: 'ADASTK', format version, byte order ('<' or '>'), number of values -- followed by the values as doubles, deepest element first
+snapshot_format = '<6sBcQ'
+snapshot_magic = b'ADASTK'
+
+
+def save_stack(stack, word, user_dict, lastx_list, mem, settings, tape):
+    """
+    Save the stack to a file, to load it again later with load. The stack is left as it is.
+
+Usage:
+    save [name] --> the stack is saved in [name].stack
+
+The values are saved as 8-byte binary numbers, not text, so load brings back even millions of values almost instantly. In vector mode, the series in x: is saved.
+    """
+    import struct
+
+    if not word:
+        print('='*45)
+        print('Usage: save [name]')
+        print('='*45)
+        return stack, lastx_list, tape, user_dict
 
-        # line up decimal points
-        p = 11 + len(fs) - fs.find('.')
+    # a series is saved in stack order: its first value is the one that would be in x:
+    if is_vector(stack[0]):
+        series = stack[0]
+        values = series[series == series][::-1].copy()
+    else:
+        try:
+            values = stack.doubles()
+        except TypeError:
+            print('='*45)
+            print('A series can only be saved from x:.')
+            print('='*45)
+            return stack, lastx_list, tape, user_dict
 
-        # print the register
-        print(stack_names[register], ':',
-              ('{:>' + str(p) + '}').format(fs), sep='')
+    # as with config.json, the file is written in full and then renamed; a stack loaded from the old file keeps reading it
+    path = word if word.endswith('.stack') else word + '.stack'
+    header = struct.pack(snapshot_format, snapshot_magic, 1, b'<' if byteorder == 'little' else b'>', len(values))
+    try:
+        with open(path + '.tmp', 'wb') as file:
+            file.write(header)
+            file.write(values)
+        os.replace(path + '.tmp', path)
+    except OSError as error:
+        print('='*45)
+        print('Stack not saved:', error.strerror)
+        print('='*45)
+        return stack, lastx_list, tape, user_dict
 
-    return stack
+    print('='*45)
+    print('{:,} values saved in {}'.format(len(values), path))
+    print('='*45)
+    return stack, lastx_list, tape, user_dict
 
-#  IMPORT FILE FUNCTIONS ====================
 
-def get_file_data(stack):
+def load_stack(stack, word, user_dict, lastx_list, mem, settings, tape):
     """
-    Import a text file and put the data on the stack.
+    Replace the stack with one saved with save.
 
-Since the stack is only a list of numbers, the file that you import should contain only one column of numbers. Lines that don't contain numbers will be skipped.
+Usage:
+    load [name] --> the stack saved in [name].stack
+
+The file is not read: it is mapped into memory, and values are read from it as they are used. Drawing x: through t: reads almost nothing, however many values there are; stats or list read them all. The first change to the stack copies the values into memory. In vector mode, the saved values become one series in x:, as they would with import.
     """
-    data_file = input('File name: ')
+    import mmap
+    import struct
 
-    # read the data file
-    try:
-        with open(data_file, 'r') as f:
-            file = f.readlines()
+    if not word:
+        print('='*45)
+        print('Usage: load [name]')
+        print('='*45)
+        return stack, lastx_list, tape, user_dict
 
-    # notify user if no file was found
+    path = word if word.endswith('.stack') else word + '.stack'
+    try:
+        with open(path, 'rb') as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, order, count = struct.unpack_from(snapshot_format, mapped)
     except FileNotFoundError:
         print('='*45)
         print('File not found. Stack unmodified.')
         print('='*45)
-        return stack
-
-    # read the values into the stack; skip any line that is not a number
-    stack, cnt = [], 0
-    for line in file:
-        try:
-            stack.append(float(line.strip('\n')))
-            cnt += 1
-        except ValueError:
-            pass
+        return stack, lastx_list, tape, user_dict
+    except (ValueError, struct.error):
+        # an empty file can't be mapped; a short one has no header
+        magic = version = count = None
 
-    # provide a report to the user
-    print('='*18, ' REPORT ', '='*19, sep='')
-    print('   Lines in file:', len(file))
-    print('Numbers imported:', cnt)
-    print('='*45, sep='')
+    start = struct.calcsize(snapshot_format)
+    if magic != snapshot_magic or version != 1 or len(mapped) != start + 8 * count:
+        print('='*45)
+        print(path, 'was not saved with save. Stack unmodified.')
+        print('='*45)
+        return stack, lastx_list, tape, user_dict
+
+    values = memoryview(mapped)[start:].cast('d')
+    if order != (b'<' if byteorder == 'little' else b'>'):
+        # saved on a machine with the other byte order: the values have to be read and swapped now
+        swapped = array('d')
+        swapped.frombytes(values.cast('B'))
+        swapped.byteswap()
+        values = swapped
+
+    if vector_mode:
+        stack.push(numpy.frombuffer(values, dtype=float)[::-1])
+    else:
+        stack = Stack.from_buffer(values)
 
-    return stack
+    print('='*45)
+    print('{:,} values loaded from {}'.format(count, path))
+    print('='*45)
+    return stack, lastx_list, tape, user_dict
 
 
 # PRINT FUNCTIONS (INDEX) ====================
@@ -554,11 +2439,7 @@ Related commands:
     h user --> details on how to create a user-defined expression
     """
     # print all the keys, values in {user_dict}
-    try:
-        with open("constants.json", 'r') as file:
-            user_dict = json.load(file)
-    except FileNotFoundError:
-        user_dict = {}
+    user_dict = constants_file.load()
 
     txt, line_width = ' USER-DEFINED CONSTANTS ', 56
     ctr1 = math.floor((line_width - len(txt)) / 2)
@@ -578,6 +2459,8 @@ def print_all_functions(stack, user_dict):
 
     This function is not used, except by the developer.
     """
+    import textwrap
+    from inspect import getmembers, isfunction
 
     # strategy: only get docstrings from things NOT in this list; this will be all the fxns that the user can use
     module_functions = ['RPN', 'process_item', 'parse_entry','print_register', 'calculator_settings', 'print_all_functions', 'print_commands', 'help', 'help_1', 'help_2', 'math_op1', 'math_op2', 'fold']
@@ -665,6 +2548,407 @@ def print_all_functions(stack, user_dict):
     return stack
 
 
+# TAPE ====================
+
+class Tape:
+    """
+    Every expression entered, in order, numbered from 1. With a path, the tape is also an append-only journal (tape.log), so it survives restarts; only the most recent <size> entries are kept in memory.
+
+    Next to the journal, tape.idx holds the byte offset of each entry as an 8-byte integer, so looking up entry n reads 8 bytes from the index and one line from the journal, however long the history. If the index is missing or doesn't match the journal, it is rebuilt from the journal.
+
+    Several calculators (or a server and a calculator) in one directory share the journal. Each append locks the journal, where the system allows it, and finds the end of the journal and the number of entries from the files themselves, so entries written by others are counted and indexed correctly.
+    """
+
+    def __init__(self, path=None, size=1000):
+        self.recent = deque(maxlen=size)
+        self.log = self.index = None
+        self.count = self.end = 0
+        if path:
+            self.open(path)
+        # number of entries from earlier sessions
+        self.session = self.count
+
+    def open(self, path):
+        index_path = os.path.splitext(path)[0] + '.idx'
+        self.log = open(path, 'a+b')
+        self.end = self.log.seek(0, os.SEEK_END)
+
+        # only the offsets of the entries kept in memory are read from the index
+        try:
+            with open(index_path, 'rb') as file:
+                count = file.seek(0, os.SEEK_END) // 8
+                first = max(0, count - self.recent.maxlen)
+                file.seek(8 * first)
+                offsets = array('q', file.read())
+        except (FileNotFoundError, ValueError):
+            offsets = None
+
+        # the index is good if its last offset is the start of the journal's last line
+        good = offsets is not None and (len(offsets) == 0) == (self.end == 0)
+        if good and offsets:
+            last = offsets[-1]
+            good = 0 <= last < self.end
+            if good:
+                self.log.seek(max(0, last - 1))
+                tail = self.log.read()
+                if last:
+                    good, tail = tail[:1] == b'\n', tail[1:]
+                good = good and tail.find(b'\n') == len(tail) - 1
+        if not good:
+            offsets = self.rebuild(index_path)
+            count = len(offsets)
+            first = max(0, count - self.recent.maxlen)
+            offsets = offsets[first:]
+
+        self.count = count
+        for offset in offsets:
+            self.recent.append(self.read(None, offset))
+        self.index = open(index_path, 'a+b')
+
+    def rebuild(self, index_path):
+        # one pass over the journal; a last line cut short (by a crash) gets its newline
+        offsets, offset = array('q'), 0
+        self.log.seek(0)
+        for line in self.log:
+            offsets.append(offset)
+            offset += len(line)
+        if offset and not line.endswith(b'\n'):
+            self.log.write(b'\n')
+            self.end += 1
+        with open(index_path, 'wb') as file:
+            offsets.tofile(file)
+        return offsets
+
+    def append(self, entry):
+        if not self.log:
+            self.recent.append(entry)
+            self.count += 1
+            return
+
+        line = entry.encode() + b'\n'
+        with self.locked():
+            # another process may have written since this one last did
+            self.end = os.fstat(self.log.fileno()).st_size
+            count = os.fstat(self.index.fileno()).st_size // 8
+            self.log.write(line)
+            self.log.flush()
+            self.index.write(array('q', [self.end]).tobytes())
+            self.index.flush()
+        self.end += len(line)
+
+        # entries written by others aren't in memory; older entries are read from the journal
+        if count != self.count:
+            self.recent.clear()
+        self.recent.append(entry)
+        self.count = count + 1
+
+    def truncate(self, count):
+        """
+        Forget every entry after the first <count> (e.g., a line that was cancelled with Ctrl-C), in memory and in the journal. If another process has written to the journal since, the entries stay: they can't be removed without removing that process's entries too.
+        """
+        if count >= self.count:
+            return
+        if self.log:
+            with self.locked():
+                if (os.fstat(self.log.fileno()).st_size != self.end
+                        or os.fstat(self.index.fileno()).st_size != 8 * self.count):
+                    return
+                self.index.seek(8 * count)
+                offset = array('q', self.index.read(8))[0]
+                self.log.truncate(offset)
+                self.index.truncate(8 * count)
+            self.end = offset
+        for i in range(min(self.count - count, len(self.recent))):
+            self.recent.pop()
+        self.count = count
+
+    def locked(self):
+        """
+        A context manager that holds an exclusive lock on the journal. Without fcntl (Windows), it does nothing.
+        """
+        import contextlib
+        try:
+            import fcntl
+        except ImportError:
+            return contextlib.nullcontext()
+
+        @contextlib.contextmanager
+        def lock():
+            fcntl.flock(self.log, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self.log, fcntl.LOCK_UN)
+        return lock()
+
+    def read(self, n, offset=None):
+        # entry n (from 0) from the journal
+        if offset is None:
+            self.index.seek(8 * n)
+            offset = array('q', self.index.read(8))[0]
+        self.log.seek(offset)
+        return self.log.readline().rstrip(b'\n').decode()
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, n):
+        """
+        Entry n (from 0; negative counts back from the latest entry). Recent entries come from memory, older ones from the journal.
+        """
+        if n < 0:
+            n += self.count
+        if not 0 <= n < self.count:
+            raise IndexError('tape index out of range')
+        if n >= self.count - len(self.recent):
+            return self.recent[n - self.count + len(self.recent)]
+        return self.read(n)
+
+    def close(self):
+        if self.log:
+            self.log.close()
+            self.index.close()
+            self.log = self.index = None
+
+
+# SETTINGS AND CONSTANTS FILES ====================
+
+class JSONFile:
+    """
+    A JSON file -- config.json or constants.json -- held in memory.
+
+    -- load() reads the file the first time, and again only if the file's modification time has changed since ada last read or wrote it (someone else edited it). The dictionary is updated in place, so every reference to it sees the new contents.
+    -- changed() records that the dictionary was edited. The write happens at most <delay> seconds later, when save() is next called, so several edits in a row cost one write.
+    -- save() writes to a temporary file and renames it over the old one, so the file is never left half-written.
+    """
+
+    def __init__(self, path, default, create=False, delay=2.0):
+        self.path = path
+        self.default = default # function that returns the contents of a new file
+        self.create = create   # write the file as soon as it is found missing
+        self.delay = delay
+        self.data = None
+        self.mtime = None      # modification time when last read or written
+        self.due = None        # time by which unsaved changes must be written; None if there are none
+
+    def load(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+
+        # unsaved changes here win over changes on disk
+        if self.data is not None and (mtime == self.mtime or self.due is not None):
+            return self.data
+
+        if mtime is None:
+            contents = self.default()
+        else:
+            with open(self.path, 'r') as file:
+                contents = json.load(file)
+
+        if self.data is None:
+            self.data = contents
+        else:
+            self.data.clear()
+            self.data.update(contents)
+        self.mtime = mtime
+
+        if mtime is None and self.create:
+            self.changed()
+            self.save(force=True)
+        return self.data
+
+    def changed(self):
+        if self.due is None:
+            self.due = perf_counter() + self.delay
+
+    def save(self, force=False):
+        """
+        Write unsaved changes if they are due, or if force is True.
+        """
+        if self.due is None or (not force and perf_counter() < self.due):
+            return
+        temp = self.path + '.tmp'
+        with open(temp, 'w') as file:
+            file.write(json.dumps(self.data, ensure_ascii=False))
+        os.replace(temp, self.path)
+        self.mtime = os.stat(self.path).st_mtime_ns
+        self.due = None
+        metrics.count('ada_json_writes_total{file="' + self.path + '"}')
+
+
+def default_settings():
+    """
+    Settings for a new config.json.
+    """
+    return {
+        'show_menu': 'Y',
+        'dec_point': '4',
+        'separator': ',',
+        'show_tape': 'N',
+        'show_tips': 'Y',
+        }
+
+
+def save_files(force=False):
+    """
+    Write config.json and constants.json if they have changes that are due (or any changes at all, if force is True).
+    """
+    settings_file.save(force)
+    constants_file.save(force)
+
+
+# {settings} and {user_dict} are settings_file.data and constants_file.data
+settings_file = JSONFile('config.json', default_settings, create=True)
+constants_file = JSONFile('constants.json', dict)
+
+
+# METRICS ====================
+
+class Metrics:
+    """
+    Counters, a gauge, and histograms describing what ada has done since it started, for programs that run ada for a long time (e.g., --serve). A snapshot can be written to a local file as JSON or in the Prometheus text format; nothing is sent anywhere.
+
+    Sample names may carry Prometheus labels, e.g., 'ada_json_writes_total{file="config.json"}'.
+    """
+
+    # upper bounds (seconds) of the histogram buckets; the last bucket, +Inf, is implied
+    buckets = (0.001, 0.01, 0.1, 1.0, 10.0)
+
+    # metric name: (type, help text)
+    described = {
+        'ada_expressions_total': ('counter', 'Lines evaluated.'),
+        'ada_tokens_total': ('counter', 'Items (numbers, operations, commands) dispatched.'),
+        'ada_unknown_commands_total': ('counter', 'Items that were not a number or a known name.'),
+        'ada_json_writes_total': ('counter', 'Writes of config.json and constants.json.'),
+        'ada_stack_depth_max': ('gauge', 'Deepest the stack has been at the end of a line.'),
+        'ada_stats_seconds': ('histogram', 'Time taken by stats to summarize the stack.'),
+        'ada_import_seconds': ('histogram', 'Time taken by import to read a file onto the stack.'),
+        }
+
+    def __init__(self):
+        self.counters = {name: 0 for name, (kind, _) in self.described.items() if kind == 'counter' and name != 'ada_json_writes_total'}
+        self.depth = 0
+        # name: [count in each bucket (not cumulative), sum, count]
+        self.histograms = {name: [[0] * (len(self.buckets) + 1), 0.0, 0] for name, (kind, _) in self.described.items() if kind == 'histogram'}
+
+    def count(self, sample, amount=1):
+        self.counters[sample] = self.counters.get(sample, 0) + amount
+
+    def observe(self, name, value):
+        histogram = self.histograms[name]
+        histogram[0][bisect_left(self.buckets, value)] += 1
+        histogram[1] += value
+        histogram[2] += 1
+
+    def take(self):
+        """
+        Return everything counted since this Metrics was made or last taken from, leaving out what is zero, and start again from zero. merge() adds it to another Metrics (see parallel_batch()).
+        """
+        counters = {sample: n for sample, n in self.counters.items() if n}
+        histograms = {name: histogram for name, histogram in self.histograms.items() if histogram[2]}
+        depth = self.depth
+        # parallel_batch() takes after every line, so only what was counted is reset
+        self.counters = dict.fromkeys(self.counters, 0)
+        for name in histograms:
+            self.histograms[name] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        self.depth = 0
+        return counters, depth, histograms
+
+    def merge(self, taken):
+        # add what take() returned
+        counters, depth, histograms = taken
+        for sample, n in counters.items():
+            self.count(sample, n)
+        if depth > self.depth:
+            self.depth = depth
+        for name, (counts, total, count) in histograms.items():
+            histogram = self.histograms[name]
+            histogram[0] = [a + b for a, b in zip(histogram[0], counts)]
+            histogram[1] += total
+            histogram[2] += count
+
+    def snapshot(self):
+        """
+        All metrics as a dictionary that json.dumps() can write.
+        """
+        histograms = {}
+        for name, (counts, total, count) in self.histograms.items():
+            cumulative, running = {}, 0
+            for bound, n in zip(self.buckets + ('+Inf',), counts):
+                running += n
+                cumulative[str(bound)] = running
+            histograms[name] = {'buckets': cumulative, 'sum': total, 'count': count}
+        return {'counters': dict(self.counters), 'gauges': {'ada_stack_depth_max': self.depth}, 'histograms': histograms}
+
+    def prometheus(self):
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        snapshot, lines, seen = self.snapshot(), [], set()
+
+        def describe(name):
+            if name not in seen:
+                seen.add(name)
+                kind, text = self.described.get(name, ('untyped', ''))
+                lines.extend(['# HELP ' + name + ' ' + text, '# TYPE ' + name + ' ' + kind])
+
+        for sample, value in sorted(snapshot['counters'].items()):
+            describe(sample.split('{')[0])
+            lines.append(sample + ' ' + str(value))
+        for sample, value in snapshot['gauges'].items():
+            describe(sample)
+            lines.append(sample + ' ' + str(value))
+        for name, histogram in snapshot['histograms'].items():
+            describe(name)
+            for bound, n in histogram['buckets'].items():
+                lines.append(name + '_bucket{le="' + bound + '"} ' + str(n))
+            lines.append(name + '_sum ' + repr(histogram['sum']))
+            lines.append(name + '_count ' + str(histogram['count']))
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """
+        Write a snapshot to path: JSON if path ends in .json, otherwise the Prometheus text format. As with config.json, the file is written in full and then renamed, so a reader never sees half of it.
+        """
+        text = json.dumps(self.snapshot(), indent=4) if path.endswith('.json') else self.prometheus()
+        temp = path + '.tmp'
+        with open(temp, 'w') as file:
+            file.write(text)
+        os.replace(temp, path)
+
+
+def metrics_command(stack, word, user_dict, lastx_list, mem, settings, tape):
+    """
+    Show or save counts of what ada has done since it started: lines evaluated, items dispatched, unknown names, writes of the settings files, the deepest the stack has been, and how long stats and import took.
+
+Usage:
+    metrics       --> show the metrics (Prometheus text format)
+    metrics json  --> save them to metrics.json
+    metrics prom  --> save them to metrics.prom (Prometheus text format)
+
+To save the metrics when ada exits (and, with --serve, every 10 seconds):
+
+    python ada.py --metrics metrics.prom ...
+    """
+    if word in ['json', 'prom']:
+        metrics.write('metrics.' + word)
+        print('Metrics saved to metrics.' + word)
+    elif word:
+        print('='*45)
+        print('Usage: metrics [json/prom]')
+        print('='*45)
+    else:
+        print('='*45)
+        print(metrics.prometheus(), end='')
+        print('='*45)
+    return stack, lastx_list, tape, user_dict
+
+
+metrics = Metrics()
+
+
 # CALCULATOR SETTINGS ====================
 
 def calculator_settings(settings):
@@ -677,21 +2961,9 @@ def calculator_settings(settings):
 
 (3) display the tape, updated after each expression is evaluated.
     """
-    # retrieve settings from config.json
-    try:
-        with open("config.json", 'r') as file:
-            settings = json.load(file)
-    except FileNotFoundError:
-        # save default settings to config.json:
-        settings = {
-                'show_menu': 'Y',
-                'dec_point': '4',
-                'separator': ',',
-                'show_tape': 'N',
-                'show_tips': 'Y',
-                }
-        with open('config.json', 'w+') as file:
-            file.write(json.dumps(settings, ensure_ascii=False))
+    # settings as they are in config.json, re-read only if the file was changed by someone else
+    settings = settings_file.load()
+    before = dict(settings)
 
     while True:
         # print the current settings
@@ -812,9 +3084,9 @@ def calculator_settings(settings):
         if s.lower() == 'e' or s.lower() == 'exit' or not s:
             break
 
-    # save {settings} to file, whether changed or not
-    with open('config.json', 'w+') as file:
-        file.write(json.dumps(settings, ensure_ascii=False))
+    # save {settings} to config.json, if changed
+    if settings != before:
+        settings_file.changed()
 
     return settings
 
@@ -859,7 +3131,7 @@ To be distinguished from:
 
 that removes all but the x:, y:, z:, and t: registers.
     """
-    stack, entry_value = [0.0, 0.0, 0.0, 0.0], ''
+    stack, entry_value = Stack([0.0, 0.0, 0.0, 0.0]), ''
     return stack
 
 # === MATH OPERATORS =====
@@ -923,7 +3195,15 @@ Note that example (2) uses a shortcut. To list shortcuts, type:
         print('='*45)
         return stack
     x = stack[0]
-    stack[0] = math.factorial(x)
+    if x > 170:
+        # too large for a float, and a very large exact factorial takes too long to compute
+        stack[0] = math.inf
+    elif x != int(x):
+        print('='*45)
+        print('Factorial is only defined for whole numbers.')
+        print('='*45)
+    else:
+        stack[0] = math.factorial(int(x))
     return stack
 
 
@@ -997,7 +3277,7 @@ def pi(stack):
     """
     Puts the value of pi on the stack.
     """
-    stack.insert(0, math.pi)
+    stack.push(math.pi)
     return stack
 
 
@@ -1042,8 +3322,9 @@ Example:
         return stack
     if y > x:
         x, y = y, x
+    import random
     ri = random.randint(y, x)
-    stack.insert(0, ri)
+    stack.push(ri)
     return stack
 
 
@@ -1054,10 +3335,8 @@ def add(stack):
 Example:
     4 3 + --> x: 7
     """
-    x, y = stack[0], stack[1]
-    stack.pop(0)
-    stack.pop(0)
-    stack.insert(0, x + y)
+    x, y = stack.pop(), stack.pop()
+    stack.push(x + y)
     return stack
 
 
@@ -1068,10 +3347,8 @@ def sub(stack):
 Example:
     4 3 - --> x: 1
     """
-    x, y = stack[0], stack[1]
-    stack.pop(0)
-    stack.pop(0)
-    stack.insert(0, y - x)
+    x, y = stack.pop(), stack.pop()
+    stack.push(y - x)
     return stack
 
 
@@ -1082,10 +3359,8 @@ def mul(stack):
 Example:
     5 3 * --> x: 15
     """
-    x, y = stack[0], stack[1]
-    stack.pop(0)
-    stack.pop(0)
-    stack.insert(0, y * x)
+    x, y = stack.pop(), stack.pop()
+    stack.push(y * x)
     return stack
 
 
@@ -1098,10 +3373,8 @@ Example:
 
 Note: division by zero will generate an error.
     """
-    x, y = stack[0], stack[1]
-    stack.pop(0)
-    stack.pop(0)
-    stack.insert(0, y / x)
+    x, y = stack.pop(), stack.pop()
+    stack.push(y / x)
     return stack
 
 
@@ -1114,10 +3387,8 @@ Example (2):
 
 Note: A useful fact is that only even numbers will result in a modulus of zero.
     """
-    x, y = stack[0], stack[1]
-    stack.pop(0)
-    stack.pop(0)
-    stack.insert(0, y % x)
+    x, y = stack.pop(), stack.pop()
+    stack.push(y % x)
     return stack
 
 
@@ -1128,37 +3399,441 @@ def pow(stack):
 Example:
     10 2 ^ --> x: 100
     """
-    x, y = stack[0], stack[1]
-    stack.pop(0)
-    stack.pop(0)
-    stack.insert(0, y ** x)
-    return stack
+    x, y = stack.pop(), stack.pop()
+    stack.push(y ** x)
+    return stack
+
+
+def math_op1(stack, item):
+    """
+    A variety of math operations on the x value.
+    """
+    operation = op1[item][0]
+    if vector_mode and is_vector(stack[0]):
+        return vector_op1(stack, operation)
+    stack = operation(stack)
+    if stack.exact and len(stack):
+        fit_integer(stack)
+    return stack
+
+
+def math_op2(stack, item):
+    """
+    Add, subtract, multiply, divide, modulus, power.
+    """
+    if vector_mode and (is_vector(stack[0]) or is_vector(stack[1])):
+        return vector_op2(stack, item)
+    if item == '/' and stack[0] == 0:
+            print('='*45)
+            print('Cannot divide by zero.')
+            print('='*45)
+            return stack
+    if stack.exact or item == '^':
+        return guarded_op2(stack, item)
+    return op2[item][0](stack)
+
+
+def guarded_op2(stack, item):
+    """
+    math_op2() for a power, which can overflow, or for a stack that may hold exact integers (see Stack.exact). A result too large for the stack leaves x: and y: as they were; an oversized exact integer becomes inf.
+    """
+    x, y = stack[0], stack[1]
+    # exact integers keep + - * % exact, but a power of two of them could take longer than anyone would wait
+    if item == '^' and (type(x) is int or type(y) is int):
+        stack[0], stack[1] = float(x), float(y)
+    try:
+        stack = op2[item][0](stack)
+    except OverflowError:
+        # the operators take x: and y: off the stack before they compute; put them back
+        stack.push(y)
+        stack.push(x)
+        print('='*45)
+        print('Result too large.')
+        print('='*45)
+        return stack
+    return fit_integer(stack)
+
+
+# === VECTOR MODE =====
+
+# NumPy is only imported when it is first needed (see import_numpy())
+numpy = None
+numpy_missing = False
+vector_mode = False
+
+# op1 functions (by name) and the NumPy function that does the same thing to every element of an array
+vector_ufuncs = {
+    'absolute': 'absolute', 'ceil': 'ceil', 'floor': 'floor', 'log': 'log10',
+    'negate': 'negative', 'square_root': 'sqrt', 'deg': 'degrees', 'rad': 'radians',
+    'sin': 'sin', 'cos': 'cos', 'tan': 'tan',
+    'asin': 'arcsin', 'acos': 'arccos', 'atan': 'arctan',
+}
+
+# op1 functions that only use arithmetic on x:, so they work on an array unchanged
+vector_safe = ['ci', 'ic', 'ftoc', 'ctof', 'go', 'og', 'kp', 'pk', 'km', 'mk', 'pi']
+
+
+def vector(stack):
+    """
+    Turn vector mode on or off. Requires NumPy.
+
+In vector mode, the whole stack becomes one data series that sits in x:, and math operations apply to every element of the series at once.
+
+Example:
+    import --> x: [50,000 values]
+
+    2 * --> every value is doubled
+
+    log --> log10 of every value
+
+Importing a second file puts a second series on the stack, and + - * / % ^ then combine the two series element by element. Values outside an operation's domain (e.g., sqrt of a negative number) become nan.
+
+Type vector again to turn vector mode off; series on the stack are spread back out into ordinary stack values.
+    """
+    global vector_mode
+
+    if not vector_mode:
+        if not import_numpy():
+            print('='*45)
+            print('Vector mode requires NumPy:\n\n    pip install numpy')
+            print('='*45)
+            return stack
+
+        # the stack, less the zeros below the last non-zero value, becomes one series
+        values = list(reversed(stack))
+        while values and values[0] == 0:
+            values.pop(0)
+        values.reverse()
+        if values:
+            stack = Stack([numpy.array(values, dtype=float)])
+        vector_mode = True
+        status = 'ON'
+    else:
+        # spread every series back out into ordinary stack values
+        values = []
+        for value in stack:
+            if is_vector(value):
+                values.extend(v for v in value.tolist() if v == v)
+            else:
+                values.append(value)
+        stack = Stack(values)
+        vector_mode = False
+        status = 'OFF'
+
+    print('='*45)
+    print('Vector mode:', status)
+    print('='*45)
+    return stack
+
+
+def import_numpy():
+    """
+    Import NumPy into {numpy} the first time it is needed, and return it; None if it is not installed. The import is only tried once.
+    """
+    global numpy, numpy_missing
+    if numpy is None and not numpy_missing:
+        try:
+            import numpy
+        except ImportError:
+            numpy_missing = True
+    return numpy
+
+
+def is_vector(value):
+    """
+    True if value is a NumPy array (which can only happen in vector mode).
+    """
+    return vector_mode and isinstance(value, numpy.ndarray)
+
+
+def vector_op1(stack, operation):
+    """
+    Apply an op1 function to every element of the series in x:.
+    """
+    name = operation.__name__ if operation else ''
+    with numpy.errstate(all='ignore'):
+        if name in vector_ufuncs:
+            stack[0] = getattr(numpy, vector_ufuncs[name])(stack[0])
+        elif name in vector_safe:
+            stack = operation(stack)
+        else:
+            print('='*45)
+            print('Not available in vector mode.')
+            print('='*45)
+    return stack
+
+
+def vector_op2(stack, item):
+    """
+    Apply an op2 operator when x:, y:, or both are series. A number combines with every element of a series; two series combine element by element.
+    """
+    x, y = stack[0], stack[1]
+    if is_vector(x) and is_vector(y) and len(x) != len(y):
+        print('='*45)
+        print('Series must be the same length:', len(y), 'and', len(x))
+        print('='*45)
+        return stack
+
+    # division by zero gives inf/nan elements instead of an error
+    with numpy.errstate(all='ignore'):
+        operation = op2[item][0]
+        stack = operation(stack)
+    return stack
+
+
+# === COMPACT STACK =====
+
+def compact(stack):
+    """
+    Turn compact mode on or off.
+
+In compact mode, the stack keeps its values in a block of 8-byte numbers instead of a list of Python floats, which take about 32 bytes each. Importing a file of 20 million numbers then takes about 160 MB instead of over 600 MB. Every command works just as it does otherwise.
+
+Example:
+    compact
+    import --> every number in the file takes 8 bytes
+
+    stats --> computed from the values each time; without compact mode, stats keeps running figures that make later calls faster, at the cost of more memory
+
+The stack stays compact while every value on it is a decimal number. A whole number (e.g., from factorial) or a series (vector mode) makes it an ordinary stack again.
+    """
+    global compact_mode
+
+    compact_mode = not compact_mode
+    stack = Stack(stack, compact=compact_mode)
+
+    print('='*45)
+    print('Compact mode:', 'ON' if compact_mode else 'OFF')
+    if compact_mode and not stack.compact:
+        print('The stack holds a value that is not a decimal\nnumber, so it is not compact yet; new\nstacks (e.g., from import) will be.')
+    print('='*45)
+    return stack
+
+
+# === MAP =====
+
+# unit conversions that are a multiply and a divide: name: (multiply by, divide by)
+# the conversion functions (ic, ci, ...) use these factors too, so map always gives the same results
+linear_conversions = {
+    'ic': (2.54, 1.0), 'ci': (1.0, 2.54),
+    'kp': (2.204_622_621_8, 1.0), 'pk': (1.0, 2.204_622_621_8),
+    'km': (0.621_371_192_24, 1.0), 'mk': (1.0, 0.621_371_192_24),
+    'go': (16.0, 453.59237), 'og': (453.59237, 16.0),
+    }
+
+
+def map_stack(stack, name, user_dict, lastx_list, mem, settings, tape):
+    """
+    Apply an operation that works on x: to every value on the stack. The operation can be any math operation that uses only x: (e.g., sqrt, ic, fc) or a user-defined expression.
+
+Example:
+    import
+    map kp --> every imported weight, in kilograms, is now in pounds
+
+Each value is treated as if it were alone in x:. Zeros at the bottom of the stack (below the deepest non-zero value) are left alone, as they are for stats. In vector mode, every value of a series is converted.
+
+Only operations that take x: and leave one result in its place can be mapped: not, e.g., round (which also uses y:), rand, or dechex (which prints its result). A user-defined expression can be mapped if it does only math, on x: alone.
+    """
+    compiled = None
+    if name in user_dict and type(user_dict[name][0]) == str:
+        compiled = get_compiled_expression(user_dict[name][0])
+
+    # one value in, one value out, and nothing else (see {pure_effects})
+    if name in linear_conversions:
+        pass
+    elif name in op1 and pure_effects.get(getattr(op1[name][0], '__name__', None)) == (1, 1):
+        function = op1[name][0]
+    elif compiled and compiled.reads is not None and compiled.reads <= 1:
+        # not through {result_cache}: a value per entry would push out everything worth keeping
+        def function(scratch):
+            compiled.run_steps(scratch, user_dict, lastx_list, mem, settings, tape)
+    else:
+        print('='*45)
+        print('Usage: map [operation]\n\n[operation] is a math operation that uses only x: and leaves one result, or a user-defined expression that does only math on x:.')
+        print('='*45)
+        return stack, lastx_list, tape, user_dict
+
+    # only floats on the stack (no exact integers or series): NumPy can convert them all at once
+    if name in linear_conversions and (stack.compact or not (stack.exact or vector_mode)) and import_numpy():
+        return map_linear(stack, *linear_conversions[name]), lastx_list, tape, user_dict
+
+    values = list(reversed(stack))
+    zeros = 0
+    while zeros < len(values) - 1 and is_real(values[zeros]) and values[zeros] == 0:
+        zeros += 1
+    part = values[zeros:]
+
+    if name in linear_conversions:
+        # one multiply and one divide per value, no stack operations (see map_linear() for the faster way)
+        multiply, divide = linear_conversions[name]
+        part = [v * multiply / divide for v in part]
+    elif compiled is None:
+        part = map_values(part, function, name)
+    else:
+        part = map_values(part, function, name, depth=4, series=False)
+
+    stack = Stack(reversed(values[:zeros] + part))
+    return stack, lastx_list, tape, user_dict
+
+
+def map_linear(stack, multiply, divide):
+    """
+    map_stack() for a linear conversion of a stack that holds only floats: the multiply and the divide are each done to every value at once, by NumPy, instead of one value at a time. Same results, since they are the same operations on the same doubles.
+    """
+    # deepest element first; zeros at the bottom are left alone, but never x:
+    doubles = stack.doubles()
+    zeros = 0
+    while zeros < len(doubles) - 1 and doubles[zeros] == 0:
+        zeros += 1
+
+    values = numpy.array(doubles, dtype=float)
+    part = values[zeros:]
+    with numpy.errstate(all='ignore'):
+        part *= multiply
+        part /= divide
+
+    if compact_mode:
+        return Stack.from_buffer(array('d', values.tobytes()))
+    return Stack(values[::-1].tolist())
+
+
+def map_values(values, function, name, depth=1, series=True):
+    """
+    Run function on a stack holding each value in x:, and return the values left in x:. Used by map_stack() for everything that isn't a linear conversion. If series is True, function is an op1 function and series are passed through vector_op1(). Messages that function prints (e.g., for a value it can't use, which it leaves unchanged) are shown once, not once per value.
+    """
+    import contextlib
+    import io
+
+    results, messages = [], io.StringIO()
+    with contextlib.redirect_stdout(messages):
+        for value in values:
+            check_cancel()
+            scratch = Stack([value])
+            scratch.pad(depth)
+            if series and is_vector(value):
+                scratch = vector_op1(scratch, function)
+            else:
+                function(scratch)
+            # a result that isn't a number leaves x: empty; keep the value as it was
+            results.append(scratch[0] if len(scratch) else value)
+
+    if messages.getvalue():
+        print('='*45)
+        print('"', name, '" could not be applied to some values.\nThey were left unchanged.', sep='')
+        print('='*45)
+    return results
+
+
+# === NUMBER SYSTEM CONVERSIONS =====
+
+# digits for bases up to 36, and the prefixes Python uses for bases 2, 8, and 16
+base_digits = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+base_prefixes = {2: '0b', 8: '0o', 16: '0x'}
+
+# an entry such as 16#ff or 36#zz: a base from 2 to 36, '#', and digits in that base
+based_literal = re.compile(r'([0-9]{1,2})#([0-9A-Za-z]+)$')
+
+
+def to_base(n, base):
+    """
+    The digits of integer n in base (2 to 36), with a leading '-' for negative numbers. Exact for integers of any size. For bases that are powers of two, the digits come straight from the binary digits (linear in their number); other bases are peeled off as many digits at a time as fit in a machine word.
+    """
+    if not 2 <= base <= 36:
+        raise ValueError('base must be 2 to 36')
+    sign, n = ('-' if n < 0 else ''), abs(n)
+
+    if base == 10:
+        return sign + str(n)
+    if base == 2:
+        return sign + format(n, 'b')
+    if base == 8:
+        return sign + format(n, 'o')
+    if base == 16:
+        return sign + format(n, 'X')
+
+    if base & (base - 1) == 0:
+        # 4 or 32: group the binary digits
+        width = base.bit_length() - 1
+        bits = format(n, 'b')
+        bits = '0' * (-len(bits) % width) + bits
+        return sign + ''.join(base_digits[int(bits[i:i+width], 2)] for i in range(0, len(bits), width))
+
+    # the largest power of base that fits in 63 bits, and the number of digits it holds
+    chunk, width = base, 1
+    while chunk * base < 1 << 63:
+        chunk, width = chunk * base, width + 1
+
+    parts = []
+    while True:
+        n, r = divmod(n, chunk)
+        digits = []
+        for i in range(width):
+            r, d = divmod(r, base)
+            digits.append(base_digits[d])
+        parts.append(''.join(reversed(digits)))
+        if not n:
+            break
+    return sign + (''.join(reversed(parts)).lstrip('0') or '0')
+
+
+def from_base(digits, base):
+    """
+    The integer whose digits (case does not matter) in base (2 to 36) are given. Exact for integers of any size. Raises ValueError if a digit is not valid in that base.
+    """
+    if not 2 <= base <= 36:
+        raise ValueError('base must be 2 to 36')
+    return int(digits, base)
+
+
+def show_base(n, base):
+    """
+    n in base, as ada shows it: 0b, 0o, or 0x in front for bases 2, 8, and 16; otherwise base#digits (e.g., 36#ZZ), which can also be typed in.
+    """
+    digits = to_base(n, base)
+    sign, digits = ('-', digits[1:]) if digits[0] == '-' else ('', digits)
+    if base in base_prefixes:
+        return sign + base_prefixes[base] + digits
+    return sign + str(base) + '#' + digits
 
 
-def math_op1(stack, item):
+def stack_integer(value):
     """
-    A variety of math operations on the x value.
+    A stack value as an exact integer (the integer part, if it has a fraction), or None if it has no integer value (inf, or a series).
     """
-    operation = op1[item][0]
-    stack = operation(stack)
-    return stack
+    if not is_real(value) or value in (math.inf, -math.inf):
+        return None
+    return int(value)
 
 
-def math_op2(stack, item):
+def push_integer(stack, n, replace=False):
     """
-    Add, subtract, multiply, divide, modulus, power.
+    Put an integer from a base conversion on the stack in x: (or in place of x:, if replace is True). It goes on the stack as a float, like any other entry, unless a float would change it; then it is kept exact. Integers too large for the stack's numbers are refused.
     """
-    if item == '/' and stack[0] == 0:
-            print('='*45)
-            print('Cannot divide by zero.')
-            print('='*45)
+    if n.bit_length() > 1023:
+        print('='*45)
+        print('Number too large for the stack.')
+        print('='*45)
+        return stack
+
+    value = float(n)
+    if value != n:
+        value = n
+    if replace:
+        stack[0] = value
     else:
-        operation = op2[item][0]
-        stack = operation(stack)
+        stack.push(value)
     return stack
 
 
-# === NUMBER SYSTEM CONVERSIONS =====
+def fit_integer(stack):
+    """
+    An exact integer in x: (see push_integer()) too large for a float becomes inf, just as a float result that large would.
+    """
+    x = stack[0]
+    if type(x) is int and x.bit_length() > 1023:
+        stack[0] = math.inf if x > 0 else -math.inf
+    return stack
+
 
 def convert_bin_to_dec(stack, bin_value='not_binary'):
     """
@@ -1172,21 +3847,12 @@ Example:
     # -- RPN() handles this directly without going to process_item()
     # -- entering '0b' is sufficient to convert binary to decimal
     # -- so entering 'bindec' actually does nothing
-
-    if stack[0] < 0:
-        print('='*45)
-        print('Cannot find binary equivalent of a negative number.')
-        print('='*45)
-        return stack
-    elif bin_value == 'not_binary':
+    if bin_value == 'not_binary':
         print('='*45)
         print('Enter binary values preceded with "0b".')
         print('='*45)
         return stack
-    else:
-        pass
-    stack[0] = int(bin_value, 2)
-    return stack
+    return convert_entry(stack, bin_value, 2, replace=True)
 
 
 def convert_dec_to_bin(stack):
@@ -1198,47 +3864,19 @@ Example:
 
 Note: the x: value remains on the stack.
     """
-    print('='*45)
-    print(bin(int(stack[0])))
-    print('='*45)
-    return stack
+    return print_in_base(stack, 2)
 
 
 def convert_dec_to_hex(stack):
     """
     Convert x: from decimal to hexadecimal. Hexadecimal number is a string, so it is reported as a string, and not placed on the stack.
-    """
-    # SOURCE:
-    # https://owlcation.com/stem/Convert-Hex-to-Decimal
-    hex_dict = {
-            '0':'0', '1':'1', '2':'2', '3':'3', '4':'4', '5':'5',
-            '6':'6', '7':'7', '8':'8', '9':'9', '10':'A',
-            '11':'B', '12':'C', '13':'D', '14':'E', '15':'F'
-            }
-    result = 1
-    hex_value = ''
-    cnt = 0
-    while True:
-        stack[0] = stack[0] / 16
-        stack = split_number(stack)
-        result = int(stack[0] * 16)
-        if stack[0] == 0 and stack[1] == 0:
-            break
-        result = hex_dict[str(result)]
-        hex_value += result
-        stack.pop(0)
-        cnt += 1
-
-    # a decimal value of zero, won't be caught by the while loop, so...
-    if cnt == 0:
-        hex_value = '0'
-    hex_value = '0x' + hex_value[::-1]
 
-    print('='*45)
-    print(hex_value)
-    print('='*45)
+Example:
+    255 dechex --> "0xFF"
 
-    return stack
+Note: the x: value remains on the stack.
+    """
+    return print_in_base(stack, 16)
 
 
 def convert_hex_to_dec(stack, hex_value='not_hex'):
@@ -1248,31 +3886,96 @@ def convert_hex_to_dec(stack, hex_value='not_hex'):
     It is not necessary to issue a command. Entering a hex number beginning with '0x' is sufficient.
 
     Example:
-    0xA --> x: 8
+    0xA --> x: 10
     """
     # ! RPN() handles this directly without going to process_item()
     # ! entering '0x' is sufficient to convert hex to decimal
     # ! so entering 'hexdec' actually does nothing
-    # SOURCE:
-    # https://owlcation.com/stem/Convert-Hex-to-Decimal
     if hex_value == 'not_hex':
         print('='*45)
         print('Enter hex values preceded with "0x".')
         print('='*45)
         return stack
+    return convert_entry(stack, hex_value, 16)
+
+
+def convert_entry(stack, digits, base, replace=False):
+    """
+    Put the number entered as digits in base on the stack. Used for entries such as 0xff, 0b101, 0o17, and 36#zz.
+    """
+    try:
+        n = from_base(digits, base)
+    except ValueError:
+        print('='*45)
+        print('"', digits, '" is not a number in base ', base, '.', sep='')
+        print('='*45)
+        return stack
+    return push_integer(stack, n, replace)
+
+
+def print_in_base(stack, base):
+    # used by convert_dec_to_bin(), convert_dec_to_hex(), and convert_to_base()
+    n = stack_integer(stack[0])
+    print('='*45)
+    if n is None:
+        print('x: has no integer value to convert.')
     else:
-        hex_dict = {
-            '0': '0', '1': '1', '2': '2', '3': '3', '4': '4', '5': '5',
-            '6': '6', '7': '7', '8': '8', '9': '9', '10': 'A',
-            '11': 'B', '12': 'C', '13': 'D', '14': 'E', '15': 'F'
-        }
-        hex_value = hex_value[::-1].upper()
-        result = 0
-        for ndx, i in enumerate(hex_value):
-            n = [k for k, v in hex_dict.items() if v == i]
-            result += (int(n[0]) * math.pow(16, ndx))
-        stack.insert(0, result)
+        print(show_base(n, base))
+        if n != stack[0]:
+            print('(integer part of x:)')
+    print('='*45)
+    return stack
+
+
+def convert_to_base(stack):
+    """
+    Show y: in the base given in x: (2 to 36). The result is a string, so it is reported, and not placed on the stack. x: is dropped; y: remains on the stack.
+
+Example:
+    255 8 base --> "0o377"
+    1295 36 base --> "36#ZZ"
+
+To enter a number in any base, type base#digits:
+
+    36#zz --> x: 1295
+    """
+    base = stack_integer(stack[0])
+    if base is None or not 2 <= base <= 36:
+        print('='*45)
+        print('The base (x:) must be 2 to 36.')
+        print('='*45)
+        return stack
+    stack.pop()
+    return print_in_base(stack, base)
+
+
+def convert_all_to_base(stack):
+    """
+    Show every value on the stack (including an imported file) in the base given in x: (2 to 36), deepest value first, x: last. x: is dropped; the rest of the stack is unchanged.
+
+Example:
+    import
+    16 baseall --> every imported value in hex
+    """
+    base = stack_integer(stack[0])
+    if base is None or not 2 <= base <= 36:
+        print('='*45)
+        print('The base (x:) must be 2 to 36.')
+        print('='*45)
         return stack
+    stack.pop()
+
+    lines = []
+    for value in reversed(stack):
+        # a series (vector mode) is shown value by value
+        for v in (value.tolist() if is_vector(value) else [value]):
+            n = stack_integer(v)
+            lines.append('not an integer' if n is None else show_base(n, base))
+    print('='*45)
+    print('\n'.join(lines))
+    print('='*45)
+    return stack
+
 
 # === USER-DEFINED CONSTANTS FUNCTIONS ====
 
@@ -1348,11 +4051,9 @@ Type:
 
 to list the current user-defined constants.
     """
-    try:
-        with open("constants.json", 'r') as file:
-            user_dict = json.load(file)
-    except:
-        user_dict = {}
+    # user_dict is constants_file.data; load() refreshes it if constants.json was changed by someone else
+    user_dict = constants_file.load()
+    before = dict(user_dict)
 
     while True:
         name, value, description = '', '', ''
@@ -1421,6 +4122,7 @@ to list the current user-defined constants.
                 if name in user_dict.keys() and value == '':
                     ok_delete = input('Delete ' + name + '? (Y/N) ')
                     if ok_delete.upper() == 'Y':
+                        compiled_expressions.pop(str(user_dict[name][0]), None)
                         del user_dict[name]
                     break
                 elif (not name in user_dict.keys()) and value == '':
@@ -1437,8 +4139,16 @@ to list the current user-defined constants.
 
         # if you entered a name and a value (description is optional), update {user_dict}
         if name and value != '':
+            # an edited expression must not run from its old compiled form
+            if name in user_dict.keys():
+                compiled_expressions.pop(str(user_dict[name][0]), None)
             user_dict.update({name: (value, description)})
 
+            # expressions are optimized as they are saved
+            compiled = get_compiled_expression(value) if type(value) == str else None
+            if compiled and compiled.optimized != value:
+                print('Runs as:', compiled.optimized or '(nothing)')
+
         if not name and value == '':
             break
 
@@ -1448,8 +4158,8 @@ to list the current user-defined constants.
         if repeat.upper() == 'N':
             break
 
-    with open('constants.json', 'w+') as file:
-        file.write(json.dumps(user_dict, ensure_ascii=False))
+    if user_dict != before:
+        constants_file.changed()
 
     print('\n', '='*10, ' USER-DEFINED CONSTANTS ', '='*11, sep='')
     for k, v in user_dict.items():
@@ -1466,7 +4176,7 @@ def drop(stack):
     Drop the last element off the stack.\n\nExample:
     4 3 d --> x: 4
     """
-    stack.pop(0)
+    stack.pop()
     return stack
 
 
@@ -1481,7 +4191,7 @@ Example (2):
     4 <enter> <enter> --> y: 4  x: 4
     """
     x = stack[0]
-    stack.insert(0, x)
+    stack.push(x)
     return stack
 
 
@@ -1496,7 +4206,7 @@ Examples:
 
     3 4 lastx --> z: 3  y: 4  x: 4 (duplicates x:)
     """
-    stack.insert(0, lastx_list[0])
+    stack.push(lastx_list[0])
     return stack
 
 
@@ -1508,31 +4218,37 @@ def list_stack(stack):
     print()
 
     # stack must always have at least 4 elements
-    while len(stack) < 4:
-        stack.insert(len(stack), 0.0)
+    stack.pad(4)
 
     # add blank stack_names, as needed
     r = '  '
     for i in range(len(stack) - 4):
         stack_names.append(r)
 
+    # the number of decimals comes from {settings}; no thousands separator here
+    fixed, scientific = register_formats(settings['dec_point'])
+
     print('='*15, ' CURRENT STACK ', '='*15)
-    for register in range(len(stack)-1, -1, -1):
-        # get the number of decimals from {settings}
-        dp = settings['dec_point']
+    for register, value in zip(range(len(stack)-1, -1, -1), reversed(stack)):
+        check_cancel()
+
+        # a series (vector mode) is shown by its length
+        if is_vector(value):
+            print(stack_names[register], ':', '{:>16}'.format(
+                '[{:,} values]'.format(len(value))), sep='')
+            continue
 
-        if (stack[register] > 1e9 or stack[register] < (-1 * 1e8)) and (stack[register] != 0.0):
+        if (value > 1e9 or value < (-1 * 1e8)) and (value != 0.0):
             # switch to scientific notation
-            fs = ('{:.0' + dp + 'e}').format(stack[register])
+            fs = scientific(finite_or_inf(value))
         else:
             # switch to regular number notation
-            fs = ('{:.0' + dp + 'f}').format(stack[register])
+            fs = fixed(value)
 
         # line up decimal points
         p = 11 + len(fs) - fs.find('.')
 
-        print(stack_names[register], ':',
-              ('{:>' + str(p) + '}').format(fs), sep='')
+        print(stack_names[register], ':', fs.rjust(p), sep='')
 
     print('='*45)
 
@@ -1541,31 +4257,95 @@ def list_stack(stack):
 
 def print_tape(stack, tape):
     """
-    Display the tape (a running record of all expressions) from the current session.
+    Display the tape (a running record of all expressions) from the current session. Each expression is numbered, for use with <recall> and <rerun>; expressions from earlier sessions are kept in tape.log.
     """
-    if tape:
-        tape = tape[0:-1] if tape[-1] == 'tape' else tape
+    first, last = max(tape.session, len(tape) - len(tape.recent)), len(tape)
+    # leave out the <tape> command that asked for this
+    if last > first and tape[-1] == 'tape':
+        last -= 1
+
     print('='*19, ' TAPE ', '='*20, sep='')
-    ndx = 0
-    while True:
-        try:
-            if tape[ndx] not in ['about', 'com', 'con', 'const', 'list', 'index', 'math', 'set', 'short', 'user', 'usercon', 'c', 'q', 'u', ]:
-                print(tape[ndx])
-            # , '=', tape[ndx+1])
-            ndx += 1
-            if ndx >= len(tape):
-                break
-        except IndexError:
-            break
+    if first > tape.session:
+        print('(', first - tape.session, ' earlier; use [n] recall)', sep='')
+    for n in range(first, last):
+        if tape[n] not in ['about', 'com', 'con', 'const', 'list', 'index', 'math', 'set', 'short', 'user', 'usercon', 'c', 'q', 'u', ]:
+            print('{:>5}  {}'.format(n + 1, tape[n]))
+    print('='*45)
+    return tape
+
+
+def tape_number(stack, tape):
+    """
+    Return x: as a tape entry number, or None (after telling the user) if there is no such entry.
+    """
+    n = stack[0]
+    if is_real(n) and 1 <= n <= len(tape) and n == int(n):
+        return int(n)
     print('='*45)
+    print('Tape entries are numbered 1 to ', len(tape), '.\nType:\n\n\ttape\n\nto see the numbers.', sep='')
+    print('='*45)
+    return None
+
+
+def recall_tape(stack, tape):
+    """
+    Show an expression from the tape, from this session or an earlier one. Put its number (see <tape>) in x:.
+
+Example:
+    12 recall --> 12  4 16 s 2 ^ 4 / /
+    """
+    n = tape_number(stack, tape)
+    if n:
+        stack.pop()
+        print('='*45)
+        print('{:>5}  {}'.format(n, tape[n-1]))
+        print('='*45)
     return tape
 
+
+def rerun_tape(stack, user_dict, lastx_list, mem, settings, tape):
+    """
+    Run an expression from the tape again, from this session or an earlier one. Put its number (see <tape>) in x:.
+
+Example:
+    12 rerun --> runs "4 16 s 2 ^ 4 / /" again
+    """
+    global rerunning
+
+    # an entry that reruns itself (directly, or through a user-defined expression) would never end
+    if rerunning:
+        print('='*45)
+        print('rerun cannot be used by an expression that is being rerun.')
+        print('='*45)
+        return stack, lastx_list, tape, user_dict
+
+    n = tape_number(stack, tape)
+    if n:
+        entry = tape[n-1]
+        stack.pop()
+        # an empty entry was <ENTER>, which duplicates x:
+        if not entry:
+            stack.push(stack[0])
+        else:
+            rerunning = True
+            try:
+                stack, lastx_list, tape, user_dict, settings, quit = evaluate(
+                    stack, user_dict, lastx_list, mem, settings, tape, entry)
+            finally:
+                rerunning = False
+    return stack, lastx_list, tape, user_dict
+
+
+# True while rerun_tape() is running an entry
+rerunning = False
+
+
 def roll_up(stack):
     """
     Roll the stack up. x:-->y:, y:-->z:, z:-->t:, and t: wraps around to become x:.
     """
-    x, y, z, t = stack[0], stack[1], stack[2], stack[3]
-    stack[0], stack[1], stack[2], stack[3] = t, x, y, z
+    x, y, z, t = stack.x, stack.y, stack.z, stack.t
+    stack.x, stack.y, stack.z, stack.t = t, x, y, z
 
     return stack
 
@@ -1574,8 +4354,8 @@ def roll_down(stack):
     """
     Roll the stack down. t:-->z:, z:-->y:, y:-->x:, and x: wraps around to become t:.
     """
-    x, y, z, t = stack[0], stack[1], stack[2], stack[3]
-    stack[0], stack[1], stack[2], stack[3] = y, z, t, x
+    x, y, z, t = stack.x, stack.y, stack.z, stack.t
+    stack.x, stack.y, stack.z, stack.t = y, z, t, x
     return stack
 
 
@@ -1589,7 +4369,7 @@ def round_y(stack):
         print('Cannot round by a negative number.')
         print('='*45)
     else:
-        stack.pop(0)
+        stack.pop()
         stack[0] = round(y, x)
     return stack
 
@@ -1601,8 +4381,8 @@ def split_number(stack):
     n = stack[0]
     n_int = int(n)
     n_dec = n - n_int
-    stack.insert(0, n_int)
-    stack.insert(0, n_dec)
+    stack.push(n_int)
+    stack.push(n_dec)
     return stack
 
 
@@ -1612,8 +4392,8 @@ def square_root(stack):
     """
     x = stack[0]
     if x >= 0:
-        stack.pop(0)
-        stack.insert(0, math.sqrt(x))
+        stack.pop()
+        stack.push(math.sqrt(x))
     else:
         print('='*45)
         print('Square root of a negative number is undefined.')
@@ -1625,23 +4405,15 @@ def stats(stack):
     """
     Summary stats for stack.\n\nResults include:\n-- Count\n-- Mean\n-- Median\n-- Standard deviation\n-- Minimum\n-- Maximum\n-- Sum\n\nNote: This function is non-destructive: the stack is left intact.
     """
-    # strip out all the zero values at the beginning of a copy of [stack]
-    stack_copy = stack.copy()
-    for i in range(len(stack_copy)-1, 0, -1):
-        if stack_copy[i] == 0:
-            stack_copy.pop(i)
-        else:
-            break
+    # in vector mode, the stats are for the series in x:
+    start = perf_counter()
+    if is_vector(stack[0]):
+        cnt, mn, md, sd, minimum, maximum, sm = summarize(stack[0].tolist())
+    else:
+        cnt, mn, md, sd, minimum, maximum, sm = stack.summary()
+    metrics.observe('ada_stats_seconds', perf_counter() - start)
     print()
 
-    # get the stats: count, mean, median, min, max, sum; save sd for later
-    cnt = len(stack_copy)
-    mn = sum(stack_copy)/len(stack_copy)
-    md = statistics.median(stack_copy)
-    minimum = min(stack_copy)
-    maximum = max(stack_copy)
-    sm = sum(stack_copy)
-
     fs = '{:.' + settings['dec_point'] + 'f}'
     print('='*12, ' SUMMARY STATISTICS ', '='*13, sep='')
     print('        Count:', fs.format(cnt))
@@ -1649,13 +4421,9 @@ def stats(stack):
     print('       Median:', fs.format(md))
 
     err = '' # required if there's a statistics error
-    # get standard deviation, catching potential error
-    try:
-        sd = statistics.stdev(stack_copy)
+    if sd is not None:
         print('      St. dev:', fs.format(sd))
-
-    except statistics.StatisticsError:
-        sd = ''
+    else:
         err = "Standard deviation requires at least two non-zero data points."
         print('      St. dev: not computed')
 
@@ -1669,6 +4437,63 @@ def stats(stack):
     return stack
 
 
+def summarize(values):
+    """
+    Return (count, mean, median, st. dev., minimum, maximum, sum) for a list of values, in stack order (x: first), computed from scratch. Zero values at the end of the list (the bottom of the stack) are ignored. St. dev. is None if there are fewer than two values.
+    """
+    import statistics
+
+    # strip out all the zero values at the beginning of a copy of [stack]
+    stack_copy = list(values)
+    for i in range(len(stack_copy)-1, 0, -1):
+        if stack_copy[i] == 0:
+            stack_copy.pop(i)
+        else:
+            break
+
+    # get the stats: count, mean, median, min, max, sum, sd
+    cnt = len(stack_copy)
+    mn = sum(stack_copy)/len(stack_copy)
+    md = statistics.median(stack_copy)
+    minimum = min(stack_copy)
+    maximum = max(stack_copy)
+    sm = sum(stack_copy)
+
+    # get standard deviation, catching potential error
+    try:
+        sd = statistics.stdev(stack_copy)
+    except statistics.StatisticsError:
+        sd = None
+
+    return cnt, mn, md, sd, minimum, maximum, sm
+
+
+def summarize_array(values):
+    """
+    summarize() for the array('d') of a compact stack, deepest element first. Nothing is copied into a list except, without NumPy, the sorted values for the median.
+    """
+    # zeros at the bottom of the stack are ignored, but never x:; a memoryview skips them without copying
+    zeros = 0
+    while zeros < len(values) - 1 and values[zeros] == 0:
+        zeros += 1
+    if zeros:
+        values = memoryview(values)[zeros:]
+
+    cnt = len(values)
+    sm = math.fsum(values)
+    mn = sm / cnt
+    sd = math.sqrt(math.fsum((v - mn) ** 2 for v in values) / (cnt - 1)) if cnt > 1 else None
+
+    if import_numpy():
+        md = float(numpy.median(numpy.frombuffer(values, dtype=float)))
+    else:
+        ordered = sorted(values)
+        half = cnt // 2
+        md = ordered[half] if cnt % 2 else (ordered[half - 1] + ordered[half]) / 2
+
+    return cnt, mn, md, sd, min(values), max(values), sm
+
+
 def swap(stack):
     """
     Swap x: and y: values on the stack.
@@ -1683,7 +4508,7 @@ Note that example (2) uses a shortcut. To list shortcuts, type:
 
     short
     """
-    stack[0], stack[1] = stack[1], stack[0]
+    stack.x, stack.y = stack.y, stack.x
     return stack
 
 
@@ -1697,7 +4522,7 @@ Note: You can use
 
 to inspect the entire stack.
     """
-    stack = stack[0:4]
+    stack = Stack(stack[0:4])
     print()
     return stack
 
@@ -1723,9 +4548,9 @@ NOTE: to detect a hex value, the string you enter must begin with '#'.
             print('='*45)
             return stack
 
-        stack.insert(0, r)
-        stack.insert(0, g)
-        stack.insert(0, b)
+        stack.push(r)
+        stack.push(g)
+        stack.push(b)
     else:
         print('='*45)
         print('You must provide a hex value.\nExample: #b31b1b')
@@ -1797,7 +4622,8 @@ def ci(stack):
     2.54 inch --> x: 1 (converts 2.54 cm to 1 inch)
     """
     # 1 in = 2.54 cm
-    stack[0] = stack[0] / 2.54
+    multiply, divide = linear_conversions['ci']
+    stack[0] = stack[0] * multiply / divide
     return stack
 
 
@@ -1808,7 +4634,8 @@ def ic(stack):
     1.00 cm --> 2.54 (converts 1 inch to 2.54 cm)
     """
     # 1 in = 2.54 cm
-    stack[0] = stack[0] * 2.54
+    multiply, divide = linear_conversions['ic']
+    stack[0] = stack[0] * multiply / divide
     return stack
 
 
@@ -1862,10 +4689,10 @@ Example (3)
         n_int = int(stack[1])
         decimal = float(n - n_int)
         inches = stack[0]
-        stack.pop(0)
-        stack.insert(0, n_int)
-        stack.insert(0, float(decimal * inches))
-        stack.insert(0, inches)
+        stack.pop()
+        stack.push(n_int)
+        stack.push(float(decimal * inches))
+        stack.push(inches)
 
     return stack
 
@@ -1881,8 +4708,8 @@ Example:
     # e.g.: enter 32 ftco and return 0
     # C = (5/9)*(°F-32)
     result = 5 / 9 * (stack[0] - 32)
-    stack.pop(0)
-    stack.insert(0, round(result, 1))
+    stack.pop()
+    stack.push(round(result, 1))
     return stack
 
 
@@ -1897,8 +4724,8 @@ Example:
     # e.g.: enter 0C ctof and return 32F
     # F = (9/5)*(°C)+32
     result = ((9 / 5) * stack[0]) + 32.0
-    stack.pop(0)
-    stack.insert(0, round(result, 1))
+    stack.pop()
+    stack.push(round(result, 1))
     return stack
 
 
@@ -1909,7 +4736,8 @@ def go(stack):
     453.5924 go --> x: 16
     """
     # e.g.: enter 16g and return 453.59237
-    stack[0] = stack[0] * 16.0 / 453.59237
+    multiply, divide = linear_conversions['go']
+    stack[0] = stack[0] * multiply / divide
     return stack
 
 
@@ -1920,7 +4748,8 @@ def og(stack):
     16 og --> 453.5924 (grams)
     """
     # e.g.: enter 16g and return 453.59237
-    stack[0] = stack[0] * 453.59237 / 16.0
+    multiply, divide = linear_conversions['og']
+    stack[0] = stack[0] * multiply / divide
     return stack
 
 def kp(stack):
@@ -1930,7 +4759,8 @@ def kp(stack):
     1 kp --> 2.204_622_621_8 pounds
     """
     # e.g: enter 1 kp and return 2.2046
-    stack[0] = stack[0] * 2.204_622_621_8
+    multiply, divide = linear_conversions['kp']
+    stack[0] = stack[0] * multiply / divide
     return stack
 
 def pk(stack):
@@ -1940,7 +4770,8 @@ def pk(stack):
     1 pound --> 2.204_622_621_8 pounds
     """
     # e.g: enter 1 pound and return 0.4536
-    stack[0] = stack[0] / 2.204_622_621_8
+    multiply, divide = linear_conversions['pk']
+    stack[0] = stack[0] * multiply / divide
     return stack
 
 
@@ -1951,7 +4782,8 @@ def km(stack):
     1 kilometer --> 0.621_371_192_24 miles
     """
     # e.g: enter 1 kilometer and return 0.6214
-    stack[0] = stack[0] * 0.621_371_192_24
+    multiply, divide = linear_conversions['km']
+    stack[0] = stack[0] * multiply / divide
     return stack
 
 
@@ -1962,12 +4794,125 @@ def mk(stack):
     1 mile --> 1.609344 kilometer
     """
     # e.g: enter 1 mile and return 1.6093
-    stack[0] = stack[0] / 0.621_371_192_24
+    multiply, divide = linear_conversions['mk']
+    stack[0] = stack[0] * multiply / divide
     return stack
 
 
 # MEMORY STACK FUNCTIONS ====================
 
+class Memory:
+    """
+    The memory registers: a {register number: value} dictionary that also keeps the register numbers in a sorted list. Listing comes out in order without sorting, deleting a range of registers finds the ends of the range by bisection and touches only the registers that exist, and next() and previous() find the nearest register in use.
+
+    Like Stack, the registers can keep an undo log: see checkpoint(), commit(), and rollback().
+
+    Register numbers are looked up just as the keys of a plain dictionary are: numbers that are equal (5 and 5.0, 0.0 and -0.0) are the same register. Every register number goes through _key() first, so that the dictionary and the sorted list always agree on which key a register has; nan, which can't be put in order, is kept in the dictionary only.
+    """
+
+    __slots__ = ('values', 'registers', '_undo')
+
+    def __init__(self, values=()):
+        self.values = {}
+        self.registers = []
+        # [(register, value before, or None if it was not in use)], or None
+        self._undo = None
+        self.update(values)
+
+    @staticmethod
+    def _key(register):
+        # one key for zero, whichever sign it was stored with
+        return 0.0 if register == 0 else register
+
+    def __contains__(self, register):
+        return self._key(register) in self.values
+
+    def __getitem__(self, register):
+        return self.values[self._key(register)]
+
+    def __setitem__(self, register, value):
+        register = self._key(register)
+        if self._undo is not None:
+            self._undo.append((register, self.values.get(register)))
+        if register not in self.values and register == register:
+            insort(self.registers, register)
+        self.values[register] = value
+
+    def __delitem__(self, register):
+        register = self._key(register)
+        if self._undo is not None:
+            self._undo.append((register, self.values[register]))
+        del self.values[register]
+        if register == register:
+            del self.registers[bisect_left(self.registers, register)]
+
+    def __len__(self):
+        return len(self.values)
+
+    def copy(self):
+        memory = Memory()
+        memory.values, memory.registers = self.values.copy(), self.registers.copy()
+        return memory
+
+    def checkpoint(self):
+        self._undo = []
+
+    def commit(self):
+        self._undo = None
+
+    def rollback(self):
+        undo, self._undo = self._undo, None
+        for register, value in reversed(undo or ()):
+            if value is None:
+                del self[register]
+            else:
+                self[register] = value
+
+    def update(self, values=()):
+        for register, value in (values.items() if hasattr(values, 'items') else values):
+            self[register] = value
+
+    def keys(self):
+        # for "register in mem.keys()", as with a dictionary; items() gives the registers in order
+        return self.values.keys()
+
+    def items(self):
+        # in order of register number; a nan register, which has no place in that order, comes last
+        values = self.values
+        for register in self.registers:
+            yield register, values[register]
+        if len(self.registers) < len(values):
+            for register, value in values.items():
+                if register != register:
+                    yield register, value
+
+    def delete_range(self, first, last):
+        """
+        Delete registers first to last, inclusive. Returns the number deleted.
+        """
+        lo, hi = bisect_left(self.registers, first), bisect_right(self.registers, last)
+        for register in self.registers[lo:hi]:
+            if self._undo is not None:
+                self._undo.append((register, self.values[register]))
+            del self.values[register]
+        del self.registers[lo:hi]
+        return hi - lo
+
+    def next(self, register):
+        """
+        The first register in use after <register>, or None.
+        """
+        ndx = bisect_right(self.registers, register)
+        return self.registers[ndx] if ndx < len(self.registers) else None
+
+    def previous(self, register):
+        """
+        The last register in use before <register>, or None.
+        """
+        ndx = bisect_left(self.registers, register)
+        return self.registers[ndx - 1] if ndx else None
+
+
 def mem_add(stack, mem):
     """
     Add x: to the y: memory register.
@@ -1998,15 +4943,15 @@ to inspect (list) the memory registers.
         current_value = mem[register]
         # just in case register holds something other than a number
         try:
-            stack.pop(0)
-            stack.pop(0)
+            stack.pop()
+            stack.pop()
             mem.update({register: register_value + current_value})
         except:
             print('No operation conducted.')
     else:
         try:
-            stack.pop(0)
-            stack.pop(0)
+            stack.pop()
+            stack.pop()
             mem.update({register: register_value})
         except:
             print('No operation conducted.')
@@ -2044,15 +4989,15 @@ to inspect (list) the memory registers.
         current_value = mem[register]
         # just in case register holds something other than a number
         try:
-            stack.pop(0)
-            stack.pop(0)
+            stack.pop()
+            stack.pop()
             mem.update({register: current_value - register_value})
         except:
             print('No operation conducted.')
     else:
         try:
-            stack.pop(0)
-            stack.pop(0)
+            stack.pop()
+            stack.pop()
             mem.update({register: register_value})
         except:
             print('No operation conducted.')
@@ -2083,8 +5028,8 @@ to inspect (list) the memory registers.
         print('='*45)
     # first, make sure the register exists in {mem}
     if register in mem.keys():
-        stack.pop(0)
-        stack.insert(0, mem[register])
+        stack.pop()
+        stack.push(mem[register])
     else:
         print('='*45)
         print('Memory register', str(int(stack[0])), 'does not exist.')
@@ -2098,16 +5043,50 @@ def mem_list(stack, mem):
     """
     List all elements of memory register.
     """
-    # dictionaries are not sorted, so temporarily
-    # sort {mem} by key (register number)
-    sorted_mem = dict(sorted(mem.items()))
-
+    # {mem} keeps its registers in order
     print('\n', '='*15, ' MEMORY STACK ', '='*16, sep='')
-    for k, v in sorted_mem.items():
+    for k, v in mem.items():
         print('Register ', int(k), ': ', v, sep='')
     print('='*45, sep='')
 
 
+def mem_next(stack, mem):
+    """
+    Replace x: with the number of the next memory register in use after x:.
+
+Example:
+    0 MN --> x: 3 (#3 is the lowest register in use)
+    3 MN --> x: 12 (#12 is the next register in use)
+
+Use MR to put the register's value on the stack.
+    """
+    return mem_nearest(stack, mem, mem.next, 'after')
+
+
+def mem_previous(stack, mem):
+    """
+    Replace x: with the number of the last memory register in use before x:.
+
+Example:
+    12 MP --> x: 3 (#3 is the register in use before #12)
+
+Use MR to put the register's value on the stack.
+    """
+    return mem_nearest(stack, mem, mem.previous, 'before')
+
+
+def mem_nearest(stack, mem, find, where):
+    # used by mem_next() and mem_previous()
+    register = find(stack[0]) if is_real(stack[0]) else None
+    if register is None:
+        print('='*45)
+        print('No memory register in use ', where, ' ', '{:g}'.format(stack[0]) if is_real(stack[0]) else 'x:', '.', sep='')
+        print('='*45)
+    else:
+        stack[0] = float(register)
+    return stack
+
+
 def mem_del(stack, mem):
     """
     Delete one, or a range, of memory registers. When deleting a range of registers, the order of the register numbers in x: and y: does not matter. Deletion is inclusive of the numbers you enter.
@@ -2157,26 +5136,24 @@ to inspect (list) the memory registers.
         print('Are you sure you want to delete')
         confirm = input('register ' + str(register2) + '? (Y/N) ')
         if confirm.upper() == 'N':
-            stack.pop(0)
+            stack.pop()
             return stack, mem
         if register2 in mem:
-            stack.pop(0)
+            stack.pop()
             del mem[register2]
 
     else:
         print('Are you sure you want to delete')
         confirm = input('register ' + str(register1) + ' to register ' + str(register2) + '? (Y/N) ')
         if confirm.upper() == 'N':
-            stack.pop(0)
-            stack.pop(0)
+            stack.pop()
+            stack.pop()
             return stack, mem
         else:
             # remove registers between register1 and register2, inclusive
-            for i in range(register2, register1-1, -1):
-                if i in mem:
-                    del mem[i]
-            stack.pop(0)
-            stack.pop(0)
+            mem.delete_range(register1, register2)
+            stack.pop()
+            stack.pop()
 
     return stack, mem
 
@@ -2334,13 +5311,18 @@ ada keeps track of expressions you use, and these can be displayed by typing:
 
 The tape provides a running list of expressions entered during the current session. You can use the up and down arrow keys to cycle through items you have entered. Optionally, the tape can be displayed after every operation through "settings".
 
+Each expression on the tape has a number. The tape is saved in tape.log, so expressions from earlier sessions can be shown or run again by number:
+
+    12 recall
+    12 rerun
+
 Besides the stack, ada provides three other features of interest. Type:
 
     h [related commands]
 
 for more detailed information.
 
-1. Memory register, where you can store, add, subtract, and recall numbers. Access these registers by their number. [related commands: M+, M-, MR, MD, and ML]
+1. Memory register, where you can store, add, subtract, and recall numbers. Access these registers by their number. [related commands: M+, M-, MR, MD, ML, MN, and MP]
 
 2. User-defined constants, where you can store constants, or even whole expressions, by name. These are saved between sessions. [related commands: user, usercon]
 
@@ -2358,6 +5340,7 @@ def fold(txt):
     """
     Textwraps 'txt'; used by help_fxn(), help(), basics(), and advances().
     """
+    import textwrap
     return textwrap.fill(txt, width=45)
 
 
@@ -2370,10 +5353,8 @@ Example:
     h sqrt --> Find the square root of x.
     """
 
-    # get a list of all functions and their docStrings
-    func, docString = {}, ''
-    for i in getmembers(modules[__name__], predicate=lambda f: isfunction(f) and f.__module__ == __name__):
-        func.update({i[0]: i[1].__doc__.strip('\n').strip()})
+    # all functions and their docStrings
+    func = docstrings()
 
     if item in op1.keys():
         f = op1[item]
@@ -2397,6 +5378,21 @@ Example:
 
     return stack
 
+def docstrings():
+    """
+    Return {function name: docString} for every function in ada. Built the first time help is asked for, then kept in {function_docs}.
+    """
+    if not function_docs:
+        from inspect import getmembers, isfunction
+        for name, f in getmembers(modules[__name__], predicate=lambda f: isfunction(f) and f.__module__ == __name__):
+            function_docs[name] = (f.__doc__ or '').strip('\n').strip()
+    return function_docs
+
+
+# docStrings for help_fxn(), filled in by docstrings()
+function_docs = {}
+
+
 def get_revision_number():
     """
     Manually run this function to get a revision number by uncommenting the first line of code under "if __name__ == '__main__':"
@@ -2412,213 +5408,314 @@ def get_revision_number():
     return None
 
 
-# GLOBAL FUNCTIONS AND RUN RPN() ====================
+# TABLES ====================
+
+version_num = '2.4 rev 811'
+
+# milliseconds from the first line of ada.py to the first prompt (see --startup-profile)
+STARTUP_TARGET = 25
+
+# characters that can make up a name (command, constant, register)
+letters = ascii_letters + '_' + ':'
+lower_letters = ascii_lowercase + '_' + ':'
+
+# menu gets printed on screen 4 items to a line
+menu = (
+    '<d>rop       ', '<s>wap       ', '<r>oll <u>p  ', '<r>oll<d>own',
+    '<n>eg        ', '<c>lear      ', '<usercon>stants', '',
+    '<set>tings   ', '<index>     ', '<h> [...]    ', '<q>uit       '
+    )
+
+# operations that modify or use x: only (stack[0])
+op1 = {
+    "": ('', ''),
+    "====": ('', '==== GENERAL ==========================='),
+    "abs": (absolute, "absolute value of x:"),
+    "ceil": (ceil, "6.3->7"),
+    "!": (factorial, "x: factorial"),
+    "floor": (floor, "6.9->6"),
+    "log": (log, "log10(x:)"),
+    "n": (negate, "negative of x:"),
+    # "negate": (negate, "Get the negative of x."),
+    "pi": (pi, "pi"),
+    "rand": (random_number, 'random int between x: and y:.'),
+    "round": (round_y, 'round y: by x:'),
+    "sqrt": (square_root, "sqrt(x:)"),
+    " ": ('', ''),
+    " ====": ('', '==== TRIGONOMETRY ======================'),
+    "cos": (cos, "cos(x:) -- x: must be radians"),
+    "sin": (sin, "sin(x:) -- x: must be radians"),
+    "tan": (tan, "tan(x:) -- x: must be radians"),
+    "acos": (acos, "acos(x:) -- x: must be radians"),
+    "asin": (asin, "asin(x:) -- x: must be radians"),
+    "atan": (atan, "atan(x:) -- x: must be radians"),
+    "deg": (deg, "convert angle x: in radians to degrees"),
+    "rad": (rad, "convert angle x: in degrees to radians"),
+    "  ": ('', ''),
+    "  ====": ('', '==== CONVERSIONS ======================='),
+    'decbin': (convert_dec_to_bin, 'Convert x: from decimal to binary.'),
+    "bindec": (convert_bin_to_dec, 'Convert x: from binary to decimal.'),
+    "dechex": (convert_dec_to_hex, 'Convert x: from decimal to hex.'),
+    "hexdec": (convert_hex_to_dec, 'Convert x: from hex to decimal.'),
+    "base": (convert_to_base, 'Show y: in base x: (2 to 36).'),
+    "baseall": (convert_all_to_base, 'Show the whole stack in base x:.'),
+    'ic': (ic, 'Convert inches to centimeters.'),
+    'ci': (ci, 'Convert centimeters to inches.'),
+    'cf': (ctof, 'Convert centigrade to Fahrenheit.'),
+    'fc': (ftoc, 'Convert Fahrenheit to centigrade.'),
+    'go': (go, 'Convert weight from grams to ounces.'),
+    'og': (og, 'Convert weight from ounces to grams.'),
+    'i': (lengths, 'Convert decimal measure to fraction.'),
+    'kp': (kp, 'Convert kilograms to pounds.'),
+    'pk': (pk, 'Convert pounds to kilograms.'),
+    'km': (km, 'Convert kilometers to miles.'),
+    'mk': (mk, 'Convert miles to kilometers.')
+}
+
+# operations that require both x: and y: (stack[0] and stack[1])
+op2 = {
+    "    ": ('', ''),
+    "====": ('', '==== STANDARD OPERATORS ================'),
+    "+": (add, "y: + x:"),
+    "-": (sub, "y: - x:"),
+    "*": (mul, "y: * x:"),
+    "x": (mul, "y: * x:"),
+    "/": (truediv, "y: / x:"),
+    "%": (mod, "remainder from division"),
+    "^": (pow, "y: ** x:"),
+}
+
+# general commands that provide function beyond math operators
+commands = {
+    "      ====": ('', '==== GENERAL ==========================='),
+    "about": (about, "Info about the author and product."),
+    "import": (get_file_data, "Import data from a text file."),
+    'load': (load_stack, 'load [name]: replace the stack with a saved one.'),
+    'metrics': (metrics_command, 'metrics [json/prom]: show or save metrics.'),
+    'prof': (profile_command, 'prof [on/off/report]: time each operation.'),
+    'save': (save_stack, 'save [name]: save the stack in [name].stack.'),
+    'set': (calculator_settings, 'Access and edit settings.'),
+    'version': (version, 'Report the version number as a string.'),
+    "     ": ('', ''),
+    " ====": ('', '==== COLOR ============================='),
+    'alpha': (get_hex_alpha, 'Hex equivalent of RGB alpha value.'),
+    'hex': (rgb_to_hex, 'Convert rgb color (z:, y:, x:) to hex color.'),
+    "list_alpha": (list_alpha, "List all alpha values."),
+    'rgb': (hex_to_rgb, 'Convert hex color to rgb.'),
+    "      ": ('', ''),
+    "  ====": ('', '==== HELP =============================='),
+    'help': (help, 'How to get help.'),
+    "index": (manual, "Menu to access parts of the manual."),
+    "basics": (basics, "The basics of RPN."),
+    "advanced": (advanced, 'Advanced help: how to use ada.'),
+    "com": (print_commands, "List all commands and math operations."),
+    "math": (print_math_ops, "List math operations."),
+    "con": (print_constants, 'List constants.'),
+    "short": (print_shortcuts, 'Available shortcut functions.'),
+    "       ": ('', ''),
+    "   ====": ('', '==== MEMORY REGISTERS =================='),
+    "M+": (mem_add, 'Add x: to y: memory register.'),
+    "M-": (mem_sub, 'Subtract x: from y: memory register.'),
+    "MR": (mem_recall, 'Put x: register value on stack.'),
+    "MD": (mem_del, 'Delete one or all memory registers.'),
+    "ML": (mem_list, 'List elements of memory register.'),
+    "MN": (mem_next, 'Next memory register in use after x:.'),
+    "MP": (mem_previous, 'Last memory register in use before x:.'),
+    "        ": ('', ''),
+    "    ====": ('', '==== STACK MANIPULATION ================'),
+    "clear": (clear, "Clear all elements from the stack."),
+    "compact": (compact, "Compact mode on/off: 8 bytes per value."),
+    "drop": (drop, "Drop the last element off the stack."),
+    "dup": (dup, "Duplicate the last stack element."),
+    "lastx": (get_lastx, "Put the lastx value on the stack."),
+    "list": (list_stack, "Show the entire stack."),
+    "map": (map_stack, "map [operation]: do operation to every value."),
+    "recall": (recall_tape, "Show tape entry number x:."),
+    "rerun": (rerun_tape, "Run tape entry number x: again."),
+    "rolldown": (roll_down, "Roll stack down."),
+    "rollup": (roll_up, "Roll stack up."),
+    "split": (split_number, "Splits x: into integer and decimal parts."),
+    'stats': (stats, 'Summary stats (non-destructive).'),
+    "swap": (swap, "Swap x: and y: values on the stack."),
+    'tape': (print_tape, "Display tape from current session, numbered."),
+    "trim": (trim_stack, 'Remove stack, except the x:, y:, z:, and t:.'),
+    "vector": (vector, 'Vector mode on/off: math on whole series.'),
+    "         ": ('', ''),
+    "     ====": ('', '==== USER-DEFINED ======================'),
+    "usercon": (print_dict, "List user-defined constants."),
+    "user": (define_constant, 'Add/edit user-defined constant.'),
+    "cache": (cache_command, 'cache [on/off/clear]: saved expression results.'),
+    "opt": (optimize_command, 'opt [verify]: show optimized expressions.'),
+}
+
+# http://www.onlineconversion.com
+# constant names MUST be lowercase
+constants = {
+    "avogadro": (6.022_140_9e+23, "avogadro's number"),
+    "golden_ratio": (1.618033988749895, 'golden ratio'),
+    "gram": (0.035_273_961_95, "ounce"),
+    "inches_hg": (25.399_999_705, "mmHg"),
+    "light":  (299_792_458, "speed of light, m/s"),
+    "mmhg": (0.535_240_171_45, "inches of water"),
+    "parsec": (19_173_510_995_000, 'mile'),
+}
+
+shortcuts = {
+    'c': (clear, 'Clear all elements from the stack.'),
+    'd': (drop, 'Drop the last element off the stack.'),
+    'h': (help, 'Help for a single command.'),
+    'n': (negate, 'Negative of x:'),
+    'q': ('', 'Quit.'),
+    'r': (round_y, 'round y by x:'),
+    'rd': (roll_down, 'Roll the stack down.'),
+    'ru': (roll_up, 'Roll the stack up.'),
+    's': (swap, 'Swap x: and y: values on the stack.'),
+        }
 
-if __name__ == '__main__':
+# keys are "percent transparency" and values are "alpha code" for hex colors; 0% is transparent; 100% is no transparency
+alpha = {
+    '100': 'FF',
+    '95': 'F2',
+    '90': 'E6',
+    '85': 'D9',
+    '80': 'CC',
+    '75': 'BF',
+    '70': 'B3',
+    '65': 'A6',
+    '60': '99',
+    '55': '8C',
+    '50': '80',
+    '45': '73',
+    '40': '66',
+    '35': '59',
+    '30': '4D',
+    '25': '40',
+    '20': '33',
+    '15': '26',
+    '10': '1A',
+    '5': '0D',
+    '0': '00'
+    }
 
-    # get_revision_number()
+# every name the user can type, mapped to its Handler
+dispatch = build_dispatch()
 
-    version_num = '2.4 rev 811'
+# the compiled tokenizer for split_entry()
+token_pattern = build_tokenizer()
 
-    print('ada ' + version_num[0:3] +  ' - an RPN calculator')
 
-    # initialize the x, y, z, and t registers, and other global variables
-    stack, entered_value = [0.0], 0.0
-    lastx_list, mem, tape = [0.0], {}, []
-    letters = ascii_letters + '_' + ':'
-    lower_letters = ascii_lowercase + '_' + ':'
+startup_marks.append(('tables', perf_counter()))
 
-    # initial setup by saving default settings to config.json
-    # if the file already exists, then put contents in {settings}
-    try:
-        with open("config.json", 'r') as file:
-            settings = json.load(file)
-    except FileNotFoundError:
-        settings = {
-            'show_menu': 'Y',
-            'dec_point': '4',
-            'separator': ',',
-            'show_tape': 'N',
-            'show_tips': 'Y',
-            }
-        # if config.json does not exist, create it
-        with open('config.json', 'w+') as file:
-            file.write(json.dumps(settings, ensure_ascii=False))
-
-    # menu gets printed on screen 4 items to a line
-    menu = (
-        '<d>rop       ', '<s>wap       ', '<r>oll <u>p  ', '<r>oll<d>own',
-        '<n>eg        ', '<c>lear      ', '<usercon>stants', '',
-        '<set>tings   ', '<index>     ', '<h> [...]    ', '<q>uit       '
-        )
-
-    # operations that modify or use x: only (stack[0])
-    op1 = {
-        "": ('', ''),
-        "====": ('', '==== GENERAL ==========================='),
-        "abs": (absolute, "absolute value of x:"),
-        "ceil": (ceil, "6.3->7"),
-        "!": (factorial, "x: factorial"),
-        "floor": (floor, "6.9->6"),
-        "log": (log, "log10(x:)"),
-        "n": (negate, "negative of x:"),
-        # "negate": (negate, "Get the negative of x."),
-        "pi": (pi, "pi"),
-        "rand": (random_number, 'random int between x: and y:.'),
-        "round": (round_y, 'round y: by x:'),
-        "sqrt": (square_root, "sqrt(x:)"),
-        " ": ('', ''),
-        " ====": ('', '==== TRIGONOMETRY ======================'),
-        "cos": (cos, "cos(x:) -- x: must be radians"),
-        "sin": (sin, "sin(x:) -- x: must be radians"),
-        "tan": (tan, "tan(x:) -- x: must be radians"),
-        "acos": (acos, "acos(x:) -- x: must be radians"),
-        "asin": (asin, "asin(x:) -- x: must be radians"),
-        "atan": (atan, "atan(x:) -- x: must be radians"),
-        "deg": (deg, "convert angle x: in radians to degrees"),
-        "rad": (rad, "convert angle x: in degrees to radians"),
-        "  ": ('', ''),
-        "  ====": ('', '==== CONVERSIONS ======================='),
-        'decbin': (convert_dec_to_bin, 'Convert x: from decimal to binary.'),
-        "bindec": (convert_bin_to_dec, 'Convert x: from binary to decimal.'),
-        "dechex": (convert_dec_to_hex, 'Convert x: from decimal to hex.'),
-        "hexdec": (convert_hex_to_dec, 'Convert x: from hex to decimal.'),
-        'ic': (ic, 'Convert inches to centimeters.'),
-        'ci': (ci, 'Convert centimeters to inches.'),
-        'cf': (ctof, 'Convert centigrade to Fahrenheit.'),
-        'fc': (ftoc, 'Convert Fahrenheit to centigrade.'),
-        'go': (go, 'Convert weight from grams to ounces.'),
-        'og': (og, 'Convert weight from ounces to grams.'),
-        'i': (lengths, 'Convert decimal measure to fraction.'),
-        'kp': (kp, 'Convert kilograms to pounds.'),
-        'pk': (pk, 'Convert pounds to kilograms.'),
-        'km': (km, 'Convert kilometers to miles.'),
-        'mk': (mk, 'Convert miles to kilometers.')
-    }
 
-    # operations that require both x: and y: (stack[0] and stack[1])
-    op2 = {
-        "    ": ('', ''),
-        "====": ('', '==== STANDARD OPERATORS ================'),
-        "+": (add, "y: + x:"),
-        "-": (sub, "y: - x:"),
-        "*": (mul, "y: * x:"),
-        "x": (mul, "y: * x:"),
-        "/": (truediv, "y: / x:"),
-        "%": (mod, "remainder from division"),
-        "^": (pow, "y: ** x:"),
-    }
+# GLOBAL FUNCTIONS AND RUN RPN() ====================
 
-    # general commands that provide function beyond math operators
-    commands = {
-        "      ====": ('', '==== GENERAL ==========================='),
-        "about": (about, "Info about the author and product."),
-        "import": (get_file_data, "Import data from a text file."),
-        'set': (calculator_settings, 'Access and edit settings.'),
-        'version': (version, 'Report the version number as a string.'),
-        "     ": ('', ''),
-        " ====": ('', '==== COLOR ============================='),
-        'alpha': (get_hex_alpha, 'Hex equivalent of RGB alpha value.'),
-        'hex': (rgb_to_hex, 'Convert rgb color (z:, y:, x:) to hex color.'),
-        "list_alpha": (list_alpha, "List all alpha values."),
-        'rgb': (hex_to_rgb, 'Convert hex color to rgb.'),
-        "      ": ('', ''),
-        "  ====": ('', '==== HELP =============================='),
-        'help': (help, 'How to get help.'),
-        "index": (manual, "Menu to access parts of the manual."),
-        "basics": (basics, "The basics of RPN."),
-        "advanced": (advanced, 'Advanced help: how to use ada.'),
-        "com": (print_commands, "List all commands and math operations."),
-        "math": (print_math_ops, "List math operations."),
-        "con": (print_constants, 'List constants.'),
-        "short": (print_shortcuts, 'Available shortcut functions.'),
-        "       ": ('', ''),
-        "   ====": ('', '==== MEMORY REGISTERS =================='),
-        "M+": (mem_add, 'Add x: to y: memory register.'),
-        "M-": (mem_sub, 'Subtract x: from y: memory register.'),
-        "MR": (mem_recall, 'Put x: register value on stack.'),
-        "MD": (mem_del, 'Delete one or all memory registers.'),
-        "ML": (mem_list, 'List elements of memory register.'),
-        "        ": ('', ''),
-        "    ====": ('', '==== STACK MANIPULATION ================'),
-        "clear": (clear, "Clear all elements from the stack."),
-        "drop": (drop, "Drop the last element off the stack."),
-        "dup": (dup, "Duplicate the last stack element."),
-        "lastx": (get_lastx, "Put the lastx value on the stack."),
-        "list": (list_stack, "Show the entire stack."),
-        "rolldown": (roll_down, "Roll stack down."),
-        "rollup": (roll_up, "Roll stack up."),
-        "split": (split_number, "Splits x: into integer and decimal parts."),
-        'stats': (stats, 'Summary stats (non-destructive).'),
-        "swap": (swap, "Swap x: and y: values on the stack."),
-        'tape': (print_tape, "Display tape from current session."),
-        "trim": (trim_stack, 'Remove stack, except the x:, y:, z:, and t:.'),
-        "         ": ('', ''),
-        "     ====": ('', '==== USER-DEFINED ======================'),
-        "usercon": (print_dict, "List user-defined constants."),
-        "user": (define_constant, 'Add/edit user-defined constant.'),
-    }
+if __name__ == '__main__':
 
-    # http://www.onlineconversion.com
-    # constant names MUST be lowercase
-    constants = {
-        "avogadro": (6.022_140_9e+23, "avogadro's number"),
-        "golden_ratio": (1.618033988749895, 'golden ratio'),
-        "gram": (0.035_273_961_95, "ounce"),
-        "inches_hg": (25.399_999_705, "mmHg"),
-        "light":  (299_792_458, "speed of light, m/s"),
-        "mmhg": (0.535_240_171_45, "inches of water"),
-        "parsec": (19_173_510_995_000, 'mile'),
-    }
+    # get_revision_number()
 
-    shortcuts = {
-        'c': (clear, 'Clear all elements from the stack.'),
-        'd': (drop, 'Drop the last element off the stack.'),
-        'h': (help, 'Help for a single command.'),
-        'n': (negate, 'Negative of x:'),
-        'q': ('', 'Quit.'),
-        'r': (round_y, 'round y by x:'),
-        'rd': (roll_down, 'Roll the stack down.'),
-        'ru': (roll_up, 'Roll the stack up.'),
-        's': (swap, 'Swap x: and y: values on the stack.'),
-            }
-
-    # keys are "percent transparency" and values are "alpha code" for hex colors; 0% is transparent; 100% is no transparency
-    alpha = {
-        '100': 'FF',
-        '95': 'F2',
-        '90': 'E6',
-        '85': 'D9',
-        '80': 'CC',
-        '75': 'BF',
-        '70': 'B3',
-        '65': 'A6',
-        '60': '99',
-        '55': '8C',
-        '50': '80',
-        '45': '73',
-        '40': '66',
-        '35': '59',
-        '30': '4D',
-        '25': '40',
-        '20': '33',
-        '15': '26',
-        '10': '1A',
-        '5': '0D',
-        '0': '00'
-        }
+    # --startup-profile alone profiles the interactive start: draw the first prompt, report, and exit
+    startup_profile = '--startup-profile' in argv[1:]
+
+    # with no arguments, run the interactive calculator; otherwise, evaluate expressions in batch mode
+    options = None
+    if argv[1:] and argv[1:] != ['--startup-profile']:
+        import argparse
+        parser = argparse.ArgumentParser(
+            description='ada - an RPN calculator. With no file or expression, starts the interactive calculator.')
+        parser.add_argument('file', nargs='?',
+            help='file of expressions, one per line; use - to read standard input')
+        parser.add_argument('-e', '--expression', action='append', default=[],
+            help='expression to evaluate; may be repeated')
+        parser.add_argument('-s', '--stack', action='store_true',
+            help='print the whole stack instead of only x:')
+        parser.add_argument('-b', '--base', type=int, metavar='BASE',
+            help='print results in BASE (2 to 36) instead of decimal')
+        parser.add_argument('-j', '--jobs', type=int, metavar='N',
+            help='evaluate each line on its own, sharing the lines among N processes; prints x: for every line')
+        parser.add_argument('--metrics', metavar='FILE',
+            help='save metrics to FILE when ada exits (JSON if FILE ends in .json, otherwise Prometheus text)')
+        parser.add_argument('--serve', metavar='ADDRESS',
+            help='evaluate JSON requests from local clients on ADDRESS: a port number or a Unix socket path')
+        parser.add_argument('--startup-profile', action='store_true',
+            help='report the time spent in each phase of starting up')
+        options = parser.parse_args()
+        # with nothing to evaluate, options such as --metrics apply to the interactive calculator
+        if not (options.file or options.expression or options.serve) and (options.stack or options.base is not None or options.jobs):
+            parser.error('nothing to evaluate: give -e EXPRESSION or a file')
+        if options.base is not None and not 2 <= options.base <= 36:
+            parser.error('--base must be 2 to 36')
+        if options.jobs is not None and options.jobs < 1:
+            parser.error('--jobs must be 1 or more')
+        if options.jobs and options.stack:
+            parser.error('--stack cannot be used with --jobs')
+        startup_marks.append(('arguments', perf_counter()))
+
+    # initialize the x, y, z, and t registers, and other global variables
+    stack, entered_value = Stack([0.0]), 0.0
+    lastx_list, mem = [0.0], Memory()
 
+    # initial setup by saving default settings to config.json
+    # if the file already exists, then put contents in {settings}
+    settings = settings_file.load()
+    startup_marks.append(('config.json', perf_counter()))
 
     # when calculator starts, read constants.json if it exists
     # this way, the user has access to user-defined constants without
     # having to do anything special
-    try:
-        with open("constants.json", 'r') as file:
-            user_dict = json.load(file)
-    except FileNotFoundError:
-        user_dict = {}
-
-    stack = RPN(stack, user_dict, lastx_list, mem, settings, tape)
+    user_dict = constants_file.load()
+    startup_marks.append(('constants.json', perf_counter()))
+
+    # changes not yet written are saved however ada exits
+    import atexit
+    atexit.register(save_files, True)
+    if options and options.metrics:
+        atexit.register(metrics.write, options.metrics)
+
+    if options and options.serve:
+        serve(options.serve, settings, user_dict, options.metrics)
+    elif options and options.jobs:
+        from itertools import chain
+        worker_settings, worker_user_dict = settings, user_dict
+        if options.file == '-':
+            parallel_batch(chain(options.expression, stdin), options.jobs, settings, user_dict, options.base)
+        elif options.file:
+            with open(options.file, 'r') as file:
+                parallel_batch(chain(options.expression, file), options.jobs, settings, user_dict, options.base)
+        else:
+            parallel_batch(options.expression, options.jobs, settings, user_dict, options.base)
+        startup_marks.append(('batch', perf_counter()))
+        if startup_profile:
+            print_startup_profile()
+    elif options and (options.file or options.expression):
+        # scripts don't add to the tape journal
+        tape = Tape()
+
+        # -e expressions run first, then the file (or standard input), read one line at a time
+        stack = batch(stack, user_dict, lastx_list, mem, settings, tape, options.expression)
+        if options.file == '-':
+            stack = batch(stack, user_dict, lastx_list, mem, settings, tape, stdin)
+        elif options.file:
+            with open(options.file, 'r') as file:
+                stack = batch(stack, user_dict, lastx_list, mem, settings, tape, file)
+
+        # print the stack, deepest element first, so that x: is always the last line
+        values = reversed(stack) if options.stack else [stack[0]]
+        for value in values:
+            print_result('', value, options.base)
+        startup_marks.append(('batch', perf_counter()))
+        if startup_profile:
+            print_startup_profile()
+    elif startup_profile:
+        tape = Tape()
+        print('ada ' + version_num[0:3] +  ' - an RPN calculator')
+        stack = print_prompt(stack, settings, tape)
+        startup_marks.append(('first prompt', perf_counter()))
+        print_startup_profile(STARTUP_TARGET)
+    else:
+        # the tape journal, kept from one session to the next
+        tape = Tape('tape.log')
+        print('ada ' + version_num[0:3] +  ' - an RPN calculator')
+        stack = RPN(stack, user_dict, lastx_list, mem, settings, tape)
 
     # the following line if for the developer only
     # stack = print_all_functions(stack, user_dict)
@@ -0,0 +1,45 @@
+"""
+bench_batch.py
+
+Throughput of batch mode: how many simple expressions per second ada evaluates when they are piped in on standard input. Start-up time (measured with a one-expression run) is subtracted, so the figure is the evaluation rate alone. The target is 100,000 expressions per second.
+
+Run from the repository root:
+
+    python benchmarks/bench_batch.py [number of expressions]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ADA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ada.py')
+TARGET = 100_000
+
+# a mix of short expressions of the kind a script would send
+EXPRESSIONS = ['2 3 +', '10 4 -', '6 7 *', '22 7 /', '2 10 ^', '9 sqrt', '100 log', '5 n', '1.5 2.5 s -', '(1 2 +)(3 4 +) *']
+
+
+def run(args, data):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, ADA] + args, input=data, stdout=subprocess.DEVNULL, check=True, text=True)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if sys.argv[1:] else 200_000
+    data = '\n'.join(EXPRESSIONS[i % len(EXPRESSIONS)] for i in range(count)) + '\n'
+
+    # run in a scratch directory; ada reads and writes config.json in the working directory
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        startup = min(run(['-e', '1'], '') for _ in range(3))
+        total = min(run(['-'], data) for _ in range(3))
+
+    rate = count / (total - startup)
+    print('        expressions: {:,}'.format(count))
+    print('     start-up (sec): {:.3f}'.format(startup))
+    print('   evaluation (sec): {:.3f}'.format(total - startup))
+    print('expressions per sec: {:,.0f}'.format(rate))
+    print('  target per second: {:,} ({})'.format(TARGET, 'met' if rate >= TARGET else 'NOT met'))
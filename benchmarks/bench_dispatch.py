@@ -0,0 +1,71 @@
+"""
+bench_dispatch.py
+
+Cost of evaluating long expressions with the old process_item() -- which tried {op1}, {op2}, {commands}, {shortcuts}, and {constants} in turn and then compared strings to choose a calling convention -- against one lookup in {dispatch}.
+
+Run from the repository root:
+
+    python benchmarks/bench_dispatch.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ada
+from ada import op1, op2, commands, shortcuts, constants, math_op1, math_op2
+
+
+def if_chain_item(stack, user_dict, lastx_list, mem, settings, tape, item):
+    # the pre-dispatch process_item(), minus the branches the benchmark never reaches
+    if item in ['(', ')']:
+        pass
+    elif type(item) == float:
+        stack.push(item)
+    elif item in op1:
+        stack = math_op1(stack, item)
+    elif item in op2:
+        stack = math_op2(stack, item)
+    elif item in commands or item in shortcuts or item in constants:
+        if item in commands:
+            operation = commands[item][0]
+        elif item in shortcuts:
+            operation = shortcuts[item][0]
+        elif item in constants:
+            stack.push(constants[item][0])
+        if item == 'lastx':
+            stack = operation(stack, lastx_list)
+        elif item in ['M+', 'M-', 'MD', 'MR', 'ML']:
+            mem = operation(stack, mem)
+        else:
+            if item not in constants:
+                stack = operation(stack)
+    return stack, lastx_list, tape, user_dict
+
+
+def dispatch_item(stack, user_dict, lastx_list, mem, settings, tape, item):
+    if type(item) == float:
+        stack.push(item)
+        return stack, lastx_list, tape, user_dict
+    return ada.dispatch[item].run(stack, user_dict, lastx_list, mem, settings, tape)
+
+
+# one pass touches op1, op2, commands, shortcuts, and constants; the stack is empty again at the end
+PATTERN = [2.0, 3.0, '+', 'sqrt', 'pi', '*', 'dup', 'x', 4.0, 's', 'log', 'golden_ratio', '+', '-', 'dup', '*', 'd']
+
+
+def run(fn, tokens):
+    stack, mem = ada.Stack(), {}
+    for item in tokens:
+        stack = fn(stack, {}, [], mem, {}, [], item)[0]
+
+
+if __name__ == '__main__':
+    print('{:>10} {:>16} {:>16} {:>8}'.format('tokens', 'if-chain (ms)', 'dispatch (ms)', 'speedup'))
+    for length in (1_000, 10_000, 100_000):
+        tokens = (PATTERN * (length // len(PATTERN) + 1))[:length]
+        old = min(timeit.repeat(lambda: run(if_chain_item, tokens), number=1, repeat=5)) * 1e3
+        new = min(timeit.repeat(lambda: run(dispatch_item, tokens), number=1, repeat=5)) * 1e3
+        print('{:>10,} {:>16.2f} {:>16.2f} {:>7.2f}x'.format(length, old, new, old / new))
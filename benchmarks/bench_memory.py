@@ -0,0 +1,75 @@
+"""
+bench_memory.py
+
+Memory taken by an imported stack, with and without compact mode. A file of numbers is imported with get_file_data(); the figures are the memory the stack holds afterwards and the peak while importing, per value, as tracemalloc counts them. stats is then run on the stack twice, and the peak memory of the first call and the time of both are shown as well: a compact stack computes its statistics from the values each time, instead of keeping the running figures an ordinary stack keeps. Times are taken in a separate run, without tracemalloc, which slows Python down.
+
+Run from the repository root:
+
+    python benchmarks/bench_memory.py [number of values]
+"""
+
+import contextlib
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ada
+
+SETTINGS = {'show_menu': 'N', 'dec_point': '4', 'separator': ',', 'show_tape': 'N', 'show_tips': 'N'}
+
+
+def quietly(function):
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        return function()
+
+
+def measure(function):
+    # (result, bytes still held afterwards, peak bytes)
+    tracemalloc.start()
+    result = quietly(function)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak
+
+
+def timed(function):
+    start = time.perf_counter()
+    quietly(function)
+    return time.perf_counter() - start
+
+
+def import_file(path, compact):
+    ada.compact_mode = compact
+    ada.input = lambda prompt='': path
+    return ada.get_file_data(ada.Stack())
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if sys.argv[1:] else 2_000_000
+    ada.settings = SETTINGS
+
+    with tempfile.TemporaryDirectory() as scratch:
+        path = os.path.join(scratch, 'numbers.txt')
+        rng = random.Random(count)
+        with open(path, 'w') as file:
+            file.write('\n'.join(repr(rng.uniform(-1_000, 1_000)) for _ in range(count)))
+
+        print('{:,} values'.format(count))
+        print('bytes per value, and seconds')
+        print('{:>8} {:>10} {:>12} {:>11} {:>12} {:>11}'.format('stack', 'held', 'import peak', 'stats peak', 'first stats', 'next stats'))
+        for label, compact in (('list', False), ('compact', True)):
+            stack, held, peak = measure(lambda: import_file(path, compact))
+            _, _, stats_peak = measure(lambda: ada.stats(stack))
+            del stack
+
+            stack = quietly(lambda: import_file(path, compact))
+            first, later = timed(lambda: ada.stats(stack)), timed(lambda: ada.stats(stack))
+            del stack
+
+            print('{:>8} {:>10.1f} {:>12.1f} {:>11.1f} {:>12.3f} {:>11.3f}'.format(
+                label, held / count, peak / count, stats_peak / count, first, later))
@@ -0,0 +1,66 @@
+"""
+bench_parallel.py
+
+Scaling of batch mode with --jobs: the time to evaluate a file of independent expressions with 1, 2, 4, and 8 worker processes, and the speed-up over one. With one job the lines are evaluated in ada's own process, so the speed-up includes the cost of starting the workers and passing lines and results between processes. Start-up time (a one-expression run) is subtracted.
+
+Run from the repository root:
+
+    python benchmarks/bench_parallel.py [number of expressions]
+
+The speed-up can't exceed the number of CPU cores, which is printed first. Last, a short run with the "spawn" start method (the default on macOS and Windows, where a worker gets nothing from ada's own process but what is passed to it) checks that commands reading the settings work in a worker.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ADA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ada.py')
+JOBS = (1, 2, 4, 8)
+
+# heavier than bench_batch.py's expressions, one per row of a report
+EXPRESSIONS = [
+    '12.5 3 ^ 7 / sqrt 2 log *', '(1 2 +)(3 4 +) * 5 sqrt +', '72 fc 100 kp + 3 /',
+    '0.5 sin 0.5 cos / 0.5 tan -', '1234.5678 2 round 99 % 5 n abs', '3.7 ceil 8.2 floor ^ 17 %',
+    ]
+
+# ada.py run as __main__ with workers started by "spawn"
+SPAWN = """
+import multiprocessing, runpy, sys
+multiprocessing.set_start_method('spawn')
+sys.argv = sys.argv[1:]
+runpy.run_path(sys.argv[0], run_name='__main__')
+"""
+
+
+def run(args):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, ADA] + args, stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if sys.argv[1:] else 200_000
+    print('     CPU cores: {}'.format(os.cpu_count()))
+    print('   expressions: {:,}'.format(count))
+
+    # run in a scratch directory; ada reads and writes config.json in the working directory
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        with open('expressions.txt', 'w') as file:
+            file.write('\n'.join(EXPRESSIONS[i % len(EXPRESSIONS)] for i in range(count)) + '\n')
+        startup = min(run(['-e', '1']) for _ in range(3))
+
+        print('{:>6} {:>12} {:>16} {:>9}'.format('jobs', 'time (sec)', 'expressions/sec', 'speed-up'))
+        single = None
+        for jobs in JOBS:
+            total = min(run(['--jobs', str(jobs), 'expressions.txt']) for _ in range(3)) - startup
+            single = single or total
+            print('{:>6} {:>12.3f} {:>16,.0f} {:>8.2f}x'.format(jobs, total, count / total, single / total))
+
+        # stats reads the settings
+        spawned = subprocess.run([sys.executable, '-c', SPAWN, ADA, '--jobs', '2', '-e', '1 2 stats', '-e', '1 2 +'],
+                                 capture_output=True, text=True)
+        passed = spawned.returncode == 0 and spawned.stdout.split()[-2:] == ['2.0', '3.0']
+        print('spawn start method: ' + ('ok' if passed else 'FAILED\n' + spawned.stderr))
@@ -0,0 +1,83 @@
+"""
+bench_server.py
+
+Load test for server mode (ada.py --serve). Starts a server on a Unix domain socket (or a localhost port, with --tcp), opens a number of concurrent client connections, and has each send its share of requests one after another, waiting for each response. Reports requests per second and the median and 99th percentile latency of a request.
+
+Run from the repository root:
+
+    python benchmarks/bench_server.py [--clients 50] [--requests 20000] [--tcp PORT]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ADA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ada.py')
+
+# the same mix of short expressions as bench_batch.py
+EXPRESSIONS = ['2 3 +', '10 4 -', '6 7 *', '22 7 /', '2 10 ^', '9 sqrt', '100 log', '5 n', '1.5 2.5 s -', '(1 2 +)(3 4 +) *']
+
+
+async def connect(address):
+    if address.isdigit():
+        return await asyncio.open_connection('127.0.0.1', int(address))
+    return await asyncio.open_unix_connection(address)
+
+
+async def client(address, count, latencies):
+    reader, writer = await connect(address)
+    for i in range(count):
+        request = json.dumps({'expression': EXPRESSIONS[i % len(EXPRESSIONS)], 'id': i}).encode() + b'\n'
+        start = time.perf_counter()
+        writer.write(request)
+        response = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - start)
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+    writer.close()
+    await writer.wait_closed()
+
+
+async def load(address, clients, requests):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(address, requests // clients, latencies) for _ in range(clients)))
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def wait_for(server):
+    # the server prints one line when it is listening
+    line = server.stdout.readline()
+    if not line.startswith('ada serving'):
+        raise RuntimeError('server did not start: ' + line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test for ada.py --serve.')
+    parser.add_argument('--clients', type=int, default=50, help='concurrent connections')
+    parser.add_argument('--requests', type=int, default=20_000, help='requests, shared among the clients')
+    parser.add_argument('--tcp', metavar='PORT', help='use a localhost port instead of a Unix socket')
+    options = parser.parse_args()
+
+    # run in a scratch directory; ada reads and writes config.json in the working directory
+    with tempfile.TemporaryDirectory() as scratch:
+        address = options.tcp or os.path.join(scratch, 'ada.sock')
+        server = subprocess.Popen([sys.executable, ADA, '--serve', address], cwd=scratch, stdout=subprocess.PIPE, text=True)
+        try:
+            wait_for(server)
+            total, latencies = asyncio.run(load(address, options.clients, options.requests))
+        finally:
+            server.terminate()
+            server.wait()
+
+    count = len(latencies)
+    print('           clients: {:,}'.format(options.clients))
+    print('          requests: {:,}'.format(count))
+    print('      requests/sec: {:,.0f}'.format(count / total))
+    print('  p50 latency (ms): {:.3f}'.format(latencies[count // 2] * 1e3))
+    print('  p99 latency (ms): {:.3f}'.format(latencies[int(count * 0.99)] * 1e3))
@@ -0,0 +1,53 @@
+"""
+bench_snapshot.py
+
+Getting a large stack back: importing a text file of numbers, against loading the same stack saved with save. load maps the file into memory instead of reading it, so it should take about the same time however many values there are; the first change to the stack then copies the values, which is shown separately.
+
+Run from the repository root:
+
+    python benchmarks/bench_snapshot.py [number of values]
+"""
+
+import contextlib
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ada
+
+
+def timed(function):
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        result = function()
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if sys.argv[1:] else 2_000_000
+
+    # save writes into the working directory
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        rng = random.Random(count)
+        with open('numbers.txt', 'w') as file:
+            file.write('\n'.join(repr(rng.uniform(-1_000, 1_000)) for _ in range(count)))
+
+        ada.input = lambda prompt='': 'numbers.txt'
+        stack, imported = timed(lambda: ada.get_file_data(ada.Stack()))
+        _, saved = timed(lambda: ada.save_stack(stack, 'numbers', {}, [0.0], {}, {}, []))
+        del stack
+
+        (stack, *_), loaded = timed(lambda: ada.load_stack(ada.Stack(), 'numbers', {}, [0.0], {}, {}, []))
+        _, changed = timed(lambda: stack.push(1.0))
+        del stack
+
+    print('            values: {:,}'.format(count))
+    print('      import (sec): {:.4f}'.format(imported))
+    print('        save (sec): {:.4f}'.format(saved))
+    print('        load (sec): {:.4f} ({:,.0f} times faster than import)'.format(loaded, imported / loaded))
+    print('first change (sec): {:.4f}'.format(changed))
@@ -0,0 +1,44 @@
+"""
+bench_stack.py
+
+Per-operation cost of the stack at increasing depths. The old [list] kept x: at index 0, so every push/pop shifted the whole stack; Stack keeps x: at the end, so the cost of "+" should stay flat whatever the depth.
+
+Run from the repository root:
+
+    python benchmarks/bench_stack.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ada
+
+
+def list_add(stack):
+    # the pre-Stack implementation of add()
+    x, y = stack[0], stack[1]
+    stack.pop(0)
+    stack.pop(0)
+    stack.insert(0, x + y)
+    return stack
+
+
+def per_op(fn, stack, push, number):
+    # each "+" is paired with a push so the depth never changes
+    def step():
+        fn(stack)
+        push(1.0)
+    return min(timeit.repeat(step, number=number, repeat=5)) / number * 1e9
+
+
+if __name__ == '__main__':
+    print('{:>10} {:>14} {:>14}'.format('depth', 'list (ns/op)', 'Stack (ns/op)'))
+    for depth in (10, 1_000, 100_000, 1_000_000):
+        number = 2_000 if depth >= 100_000 else 20_000
+        old_stack, new_stack = [1.0] * depth, ada.Stack([1.0] * depth)
+        old = per_op(list_add, old_stack, lambda v: old_stack.insert(0, v), number)
+        new = per_op(ada.add, new_stack, new_stack.push, number)
+        print('{:>10,} {:>14,.0f} {:>14,.0f}'.format(depth, old, new))
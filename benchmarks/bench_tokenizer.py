@@ -0,0 +1,75 @@
+"""
+bench_tokenizer.py
+
+Time to split long pasted expressions into items: the old character-by-character split_entry() against the compiled regular expression it now uses.
+
+Run from the repository root:
+
+    python benchmarks/bench_tokenizer.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ada
+from ada import digits, letters, lower_letters, op2
+
+
+def loop_split_entry(entered_value):
+    # the pre-regex split_entry()
+    data, s = [], ''
+    ndx = -1
+    while True:
+        ndx += 1
+        if ndx >= len(entered_value):
+            break
+        if entered_value[ndx] in ['(', ')']:
+            s = entered_value[ndx]
+        elif entered_value[ndx] in digits or entered_value[ndx] == '-' or entered_value[ndx] == '.':
+            while entered_value[ndx] in digits or entered_value[ndx] == '-' or entered_value[ndx] == '.':
+                s += entered_value[ndx]
+                try:
+                    if entered_value[ndx+1] in digits or entered_value[ndx+1] == '-' or entered_value[ndx+1] == '.':
+                        ndx += 1
+                    else:
+                        break
+                except IndexError:
+                    break
+        elif entered_value[ndx] in letters:
+            while entered_value[ndx] in letters:
+                s += entered_value[ndx]
+                try:
+                    if entered_value[ndx+1] in lower_letters:
+                        ndx += 1
+                    elif entered_value[ndx] == 'M' and entered_value[ndx+1] in ['+', '-', 'D', 'L', 'R']:
+                        s += entered_value[ndx+1]
+                        ndx += 1
+                        break
+                    else:
+                        break
+                except IndexError:
+                    break
+        elif entered_value[ndx] in op2.keys() or entered_value[ndx] == '!':
+            s += entered_value[ndx]
+        data.append(s)
+        s = ''
+    return data
+
+
+# a pasted expression: numbers, groups, operators, names, and comma-separated data
+PIECE = '(43.5 62 s d dup +) 1,234.5 -7 * sqrt M+ 3 4 ^ x: 12.75; 9 / '
+
+
+if __name__ == '__main__':
+    print('{:>12} {:>14} {:>14} {:>8}'.format('characters', 'loop (ms)', 'regex (ms)', 'speedup'))
+    for repeat in (10, 1_000, 100_000):
+        text = PIECE * repeat
+        # the old function also returned an empty string for every skipped character
+        assert [s for s in loop_split_entry(text) if s] == ada.split_entry(text)
+        number = max(1, 1_000 // repeat)
+        old = min(timeit.repeat(lambda: loop_split_entry(text), number=number, repeat=3)) / number * 1e3
+        new = min(timeit.repeat(lambda: ada.split_entry(text), number=number, repeat=3)) / number * 1e3
+        print('{:>12,} {:>14.3f} {:>14.3f} {:>7.1f}x'.format(len(text), old, new, old / new))
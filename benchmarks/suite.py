@@ -0,0 +1,231 @@
+"""
+suite.py
+
+Benchmarks for ada's hot paths: parsing, dispatch, drawing the stack, statistics, importing files, mapping an operation over the stack, hex conversion, and deleting memory registers. Results are printed as a table and can be saved as a JSON baseline, so that one version of ada can be compared with another.
+
+Run from the repository root:
+
+    python benchmarks/suite.py                              print the table
+    python benchmarks/suite.py --save baseline.json         ...and save the results
+    python benchmarks/suite.py --compare baseline.json      ...and compare with saved results
+    python benchmarks/suite.py -k parse                     only cases whose name contains "parse"
+    python benchmarks/suite.py --quick                      skip the largest sizes
+    python benchmarks/suite.py --ada old/ada.py             time another copy of ada.py
+
+To time an older revision, check its ada.py out to a scratch directory, for example with git show REVISION:ada.py > /tmp/old/ada.py, and pass it with --ada. Trees that still build their tables in the if __name__ == '__main__': block are loaded by running that block up to the first prompt. benchmarks/baseline.json was saved this way from the tree as it was before any of the performance work, when the stack was still a plain list. The suite only uses what every revision has: the stack and the memory registers are created as whatever type the loaded tree uses (see new_stack() and new_memory()).
+
+Each case is timed with timeit; the figure reported is the best of several repeats, per call. Synthetic data comes from a fixed random seed, so every run times the same work.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import timeit
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the ada module being timed; see load()
+ada = None
+
+SETTINGS = {'show_menu': 'N', 'dec_point': '4', 'separator': ',', 'show_tape': 'N', 'show_tips': 'N'}
+
+# parse_entry() input: a short line as typed, and a long one as pasted
+SHORT_EXPRESSION = '4 16 s 2 ^ 4 / /'
+LONG_EXPRESSION = '(43.5 62 s d dup +) 1,234.5 -7 * sqrt 3 4 ^ 12.75; 9 / 1.5e-3 + ' * 1_000
+
+# process_item() items for each family; each list leaves the stack as deep as it found it
+FAMILIES = {
+    'op1': ['sqrt'],
+    'op2': [2.0, '+'],
+    'command': ['dup', 'drop'],
+    'shortcut': ['s'],
+    'constant': ['golden_ratio', 'drop'],
+    'lastx': ['lastx', 'drop'],
+    'memory': [1.0, 'MR', 'drop'],
+}
+
+
+class Prompted(BaseException):
+    pass
+
+
+def prompted(prompt=''):
+    raise Prompted
+
+
+def load(path):
+    """
+    Load the ada.py at <path> as a module. An older tree that sets up its tables under if __name__ == '__main__': is run as the main program, in a scratch directory so that the settings files it writes go nowhere, and stopped at its first prompt.
+    """
+    path = os.path.abspath(path)
+    with open(path) as file:
+        source = file.read()
+    code = compile(source, path, 'exec')
+    module = sys.modules['ada'] = types.ModuleType('ada')
+    module.__file__ = path
+    exec(code, module.__dict__)
+    if hasattr(module, 'version_num'):
+        return module
+
+    module.__name__ = '__main__'
+    module.input = prompted
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch, open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        os.chdir(scratch)
+        try:
+            exec(code, module.__dict__)
+        except Prompted:
+            pass
+        finally:
+            os.chdir(cwd)
+    module.__name__ = 'ada'
+    return module
+
+
+def new_stack(values=()):
+    # values in stack order, x: first; a list in trees that have no Stack type
+    return getattr(ada, 'Stack', list)(values)
+
+
+def new_memory(values=()):
+    # memory registers, {register number: value}; a dict in trees that have no type of their own for them
+    return getattr(ada, 'Memory', dict)(values)
+
+
+def answer(reply):
+    # functions such as mem_del() and get_file_data() ask a question; give them the reply without waiting
+    ada.input = lambda prompt='': reply
+
+
+def numbers(count):
+    rng = random.Random(count)
+    return [rng.uniform(-1_000, 1_000) for _ in range(count)]
+
+
+def cases(scratch, quick):
+    """
+    Yield (name, function, setup, number) for every benchmark. setup, if given, runs (untimed) before each repeat of number calls.
+    """
+    depths = (4, 1_000) if quick else (4, 1_000, 100_000)
+    big = (1_000, 10_000) if quick else (10_000, 1_000_000)
+
+    # parsing
+    for label, text in (('short', SHORT_EXPRESSION), ('long', LONG_EXPRESSION)):
+        stack = new_stack([0.0] * 4)
+        yield 'parse_entry/' + label, lambda text=text, stack=stack: ada.parse_entry(stack, text), None, 1 if label == 'long' else 10_000
+
+    # dispatch, per family of items
+    for family, items in FAMILIES.items():
+        stack, mem, lastx_list, tape = new_stack([3.0] * 4), new_memory({1: 5.0}), [1.0], []
+
+        def run(items=items, stack=stack, mem=mem, lastx_list=lastx_list, tape=tape):
+            for item in items:
+                ada.process_item(stack, {}, lastx_list, mem, SETTINGS, tape, item)
+
+        yield 'process_item/' + family, run, None, 10_000
+
+    # drawing the stack
+    for depth in depths:
+        stack = new_stack(numbers(depth))
+        yield 'print_register/{:,}'.format(depth), lambda stack=stack: ada.print_register(stack, SETTINGS), None, 100 if depth > 1_000 else 1_000
+    for depth in depths[:2] + (10_000,):
+        stack = new_stack(numbers(depth))
+        yield 'list_stack/{:,}'.format(depth), lambda stack=stack: ada.list_stack(stack), None, 5 if depth > 1_000 else 100
+
+    # statistics, and importing a one-column file
+    for count in big:
+        stack = new_stack(numbers(count))
+        yield 'stats/{:,}'.format(count), lambda stack=stack: ada.stats(stack), None, 100
+    for count in big:
+        path = os.path.join(scratch, 'numbers_{}.txt'.format(count))
+        with open(path, 'w') as file:
+            file.write('\n'.join(repr(n) for n in numbers(count)))
+        yield 'get_file_data/{:,}'.format(count), lambda: ada.get_file_data(new_stack()), lambda path=path: answer(path), 1
+
+    # map: a linear conversion and a general op1 function over the whole stack, in trees that have the map command
+    if hasattr(ada, 'map_stack'):
+        for name in ('kp', 'sqrt'):
+            stack = new_stack([abs(n) for n in numbers(big[0])])
+            yield 'map_stack/{}/{:,}'.format(name, big[0]), lambda stack=stack, name=name: ada.map_stack(stack, name, {}, [0.0], {}, SETTINGS, []), None, 10
+
+    # hexadecimal conversion
+    yield 'convert_dec_to_hex', lambda: ada.convert_dec_to_hex(new_stack([3_735_928_559.0])), None, 1_000
+    yield 'convert_hex_to_dec', lambda: ada.convert_hex_to_dec(new_stack(), 'deadbeef'), None, 1_000
+
+    # deleting a range of memory registers
+    for count in big:
+        mem = new_memory()
+
+        def fill(mem=mem, count=count):
+            answer('Y')
+            mem.update((n, float(n)) for n in range(1, count + 1))
+
+        yield 'mem_del/{:,}'.format(count), lambda mem=mem, count=count: ada.mem_del(new_stack([1.0, float(count)]), mem), fill, 1
+
+
+def run_suite(pattern='', quick=False, repeat=5):
+    results = {}
+    ada.settings = SETTINGS
+    with tempfile.TemporaryDirectory() as scratch, open(os.devnull, 'w') as devnull:
+        for name, function, setup, number in cases(scratch, quick):
+            if pattern not in name:
+                continue
+            with contextlib.redirect_stdout(devnull):
+                times = timeit.repeat(function, setup=setup or (lambda: None), number=number, repeat=repeat)
+            results[name] = min(times) / number
+    return results
+
+
+def show(value):
+    # seconds per call, in the most readable unit
+    for unit, scale in (('s ', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if value >= scale:
+            return '{:10.2f} {}'.format(value / scale, unit)
+    return '{:10.2f} us'.format(value / 1e-6)
+
+
+def print_table(results, baseline=None):
+    header = '{:<28} {:>13}'.format('case', 'per call')
+    if baseline:
+        header += ' {:>13} {:>8}'.format('baseline', 'ratio')
+    print(header)
+    print('-' * len(header))
+    for name, value in results.items():
+        line = '{:<28} {:>13}'.format(name, show(value))
+        if baseline and name in baseline:
+            line += ' {:>13} {:>7.2f}x'.format(show(baseline[name]), value / baseline[name])
+        print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks for ada.')
+    parser.add_argument('-k', dest='pattern', default='', help='only run cases whose name contains PATTERN')
+    parser.add_argument('--ada', metavar='PATH', default=os.path.join(ROOT, 'ada.py'), help='the ada.py to time (default: the one in this repository)')
+    parser.add_argument('--quick', action='store_true', help='skip the largest sizes')
+    parser.add_argument('--save', metavar='FILE', help='save the results as a JSON baseline')
+    parser.add_argument('--compare', metavar='FILE', help='compare with a saved JSON baseline (a ratio above 1 is slower)')
+    options = parser.parse_args()
+    ada = load(options.ada)
+
+    baseline = None
+    if options.compare:
+        with open(options.compare) as file:
+            baseline = json.load(file)['results']
+
+    results = run_suite(options.pattern, options.quick)
+    print_table(results, baseline)
+
+    if options.save:
+        with open(options.save, 'w') as file:
+            json.dump({
+                'ada': ada.version_num,
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'results': results,
+                }, file, indent=4)